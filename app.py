@@ -10,6 +10,9 @@ import os
 from db.database import setup_database
 from db import queries
 from db.models import User, Elo
+from utils.csv_import import import_players, import_elos
+from utils.export import EXPORT_DATASETS, EXPORT_FORMATS, MIME_TYPES, export
+from utils import metrics, profiling, tracing
 
 # Import page modules
 from pages.available import render_available_players
@@ -25,15 +28,26 @@ st.set_page_config(
     initial_sidebar_state="auto"
 )
 
+# Opt-in metrics endpoint (BADMINTON_METRICS_PORT), tracing (BADMINTON_TRACE_FILE)
+# and render profiling (?profile=1 or BADMINTON_PROFILE=1)
+metrics.start_server()
+tracing.start_trace("rerun")
+profiling.start()
+
 # Initialize database
-setup_database()
+with profiling.stage("setup_database"):
+    setup_database()
 
 # Initialize session state
 if 'page' not in st.session_state:
     st.session_state.page = 'available'
 
+# Counted up front so runs ended early by st.rerun()/st.stop() are included
+metrics.inc('badminton_reruns_total', page=st.session_state.page)
+
 # CSS for styling
-st.markdown("""
+with profiling.stage("css"):
+    st.markdown("""
 <style>
     .main .block-container {
         padding-top: 2rem;
@@ -113,7 +127,7 @@ document.addEventListener('DOMContentLoaded', function() {
 """, unsafe_allow_html=True)
 
 # Sidebar for navigation
-with st.sidebar:
+with profiling.stage("sidebar"), st.sidebar:
     st.title("🏸 Badminton Club")
     
     # Navigation
@@ -148,63 +162,76 @@ with st.sidebar:
         # User upload for players
         uploaded_users = st.file_uploader("Upload Users CSV", type=["csv"])
         if uploaded_users is not None:
-            try:
-                # Read the CSV file
-                user_data = pd.read_csv(uploaded_users)
-                
-                if st.button("Import Users"):
-                    # Process each row to create a user
-                    for _, row in user_data.iterrows():
-                        try:
-                            user = User(
-                                display_name=row.get('display_name', ''),
-                                first_name=row.get('first_name', None),
-                                last_name=row.get('last_name', None)
-                            )
-                            queries.create_user(user)
-                        except Exception as e:
-                            st.error(f"Error importing user {row.get('display_name', '')}: {str(e)}")
-                    
-                    st.success(f"Successfully imported {len(user_data)} users")
-            except Exception as e:
-                st.error(f"Error processing user CSV: {str(e)}")
+            if st.button("Import Users"):
+                # Stream the file in chunks, committing each chunk separately
+                progress_bar = st.progress(0.0, text="Importing users...")
+                try:
+                    result = import_players(
+                        uploaded_users,
+                        with_elo=False,
+                        progress=lambda fraction, r: progress_bar.progress(fraction, text=f"Imported {r.imported} users...")
+                    )
+                    progress_bar.progress(1.0, text="Import finished")
+                    for error in result.errors:
+                        st.error(f"Error importing users: {error}")
+                    st.success(f"Successfully imported {result.imported} users")
+                    if result.skipped:
+                        st.warning(f"Skipped {result.skipped} rows")
+                except Exception as e:
+                    st.error(f"Error processing user CSV: {str(e)}")
         
         # ELO ratings upload
         uploaded_elos = st.file_uploader("Upload ELO Ratings CSV", type=["csv"])
         if uploaded_elos is not None:
+            if st.button("Import ELO Ratings"):
+                progress_bar = st.progress(0.0, text="Importing ELO ratings...")
+                try:
+                    result = import_elos(
+                        uploaded_elos,
+                        progress=lambda fraction, r: progress_bar.progress(fraction, text=f"Imported {r.imported} ELO ratings...")
+                    )
+                    progress_bar.progress(1.0, text="Import finished")
+                    for error in result.errors:
+                        st.error(f"Error importing ELO ratings: {error}")
+                    st.success(f"Successfully imported {result.imported} ELO ratings")
+                    if result.skipped:
+                        st.warning(f"Skipped {result.skipped} rows (unknown player or invalid rating)")
+                except Exception as e:
+                    st.error(f"Error processing ELO CSV: {str(e)}")
+        
+        # Data export
+        st.subheader("Export Data")
+        export_dataset = st.selectbox("Dataset", list(EXPORT_DATASETS), format_func=lambda name: name.replace('_', ' ').title())
+        export_format = st.radio("Format", EXPORT_FORMATS, format_func=str.upper, horizontal=True)
+        if st.button("Export"):
+            # Rows are streamed to a file on disk in batches
             try:
-                # Read the CSV file
-                elo_data = pd.read_csv(uploaded_elos)
-                
-                if st.button("Import ELO Ratings"):
-                    # First, get all users to match display names to user IDs
-                    users = {user['display_name']: user['id'] for user in queries.get_all_users()}
-                    
-                    # Process each row to update ELO
-                    imported_count = 0
-                    for _, row in elo_data.iterrows():
-                        try:
-                            display_name = row.get('name', '')
-                            elo_rating = float(row.get('elo', 1500))
-                            
-                            if display_name in users:
-                                user_id = users[display_name]
-                                queries.update_elo(user_id, elo_rating)
-                                imported_count += 1
-                        except Exception as e:
-                            st.error(f"Error importing ELO for {display_name}: {str(e)}")
-                    
-                    st.success(f"Successfully imported {imported_count} ELO ratings")
+                with st.spinner("Exporting..."):
+                    path, count = export(export_dataset, export_format)
+                st.caption(f"{count} rows written to {path}")
+                # Offered only in the run that wrote the file: the button loads the whole
+                # file into memory, so later reruns do not rebuild it
+                with open(path, "rb") as f:
+                    st.download_button(
+                        "Download Export",
+                        data=f,
+                        file_name=path.name,
+                        mime=MIME_TYPES[export_format]
+                    )
             except Exception as e:
-                st.error(f"Error processing ELO CSV: {str(e)}")
+                st.error(f"Error exporting data: {str(e)}")
 
 # Main content based on selected page
-if st.session_state.page == 'available':
-    render_available_players()
-elif st.session_state.page == 'matches':
-    render_matches()
-elif st.session_state.page == 'stats':
-    render_stats()
-elif st.session_state.page == 'players':
-    render_players()
+with profiling.stage(f"page: {st.session_state.page}"):
+    if st.session_state.page == 'available':
+        render_available_players()
+    elif st.session_state.page == 'matches':
+        render_matches()
+    elif st.session_state.page == 'stats':
+        render_stats()
+    elif st.session_state.page == 'players':
+        render_players()
+
+profiling.finish(st.session_state.page)
+tracing.finish_trace(page=st.session_state.page)
 
@@ -0,0 +1,246 @@
+"""
+Micro-benchmarks for the matching and ELO algorithms.
+
+Matching functions are timed over pool sizes from 4 to 200 players, ELO
+functions over batches of rating updates up to 100k (1M with --full). Each
+series reports latency percentiles per size plus a fitted complexity
+exponent (the slope of log(latency) against log(size); ~1 is linear, ~3
+cubic).
+
+Every run also times a fixed pure-Python baseline workload. The limits in
+benchmarks/thresholds.json are stored as multiples of that baseline's median
+rather than as milliseconds, so they carry over between machines of
+different speed. With --check, each median is compared to its limit times
+the baseline measured in the same run, and the run exits non-zero if any
+function got slower than that.
+
+Usage:
+    python -m benchmarks.bench_algorithms --check
+    python -m benchmarks.bench_algorithms --full --update-thresholds
+"""
+import argparse
+import json
+import math
+import platform
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from db.models import PlayerTable
+from utils import elo, matching
+from benchmarks.synthetic import DEFAULT_SEED
+
+POOL_SIZES = [4, 8, 16, 32, 64, 128, 200]
+BATCH_SIZES = [1_000, 10_000, 100_000]
+# Added by --full; a 1M batch takes seconds per sample
+FULL_BATCH_SIZES = BATCH_SIZES + [1_000_000]
+
+THRESHOLDS_PATH = Path(__file__).with_name("thresholds.json")
+
+# Thresholds are written as measured median x this factor, to absorb machine noise
+DEFAULT_HEADROOM = 3.0
+
+# Floor for limits at check time, so microsecond timings don't fail on scheduler noise
+MIN_THRESHOLD_MS = 0.05
+
+# Sampling budget per (function, size): stop at whichever limit is hit first
+MIN_SAMPLES = 5
+MAX_SAMPLES = 200
+TARGET_SECONDS = 0.25
+
+def _player_table(rng: random.Random, size: int) -> PlayerTable:
+    return PlayerTable(range(1, size + 1), [rng.gauss(1500, 150) for _ in range(size)], [None] * size)
+
+def _percentile(sorted_values: Sequence[float], fraction: float) -> float:
+    return sorted_values[min(int(len(sorted_values) * fraction), len(sorted_values) - 1)]
+
+def measure(call: Callable[[], Any], samples: Optional[int] = None) -> Dict[str, float]:
+    """
+    Time a call repeatedly and return latency percentiles in milliseconds.
+
+    Without an explicit sample count, calls are repeated until TARGET_SECONDS
+    is spent (bounded by MIN_SAMPLES and MAX_SAMPLES).
+    """
+    call()  # warm-up
+    timings: List[float] = []
+    spent = 0.0
+    while True:
+        start = time.perf_counter()
+        call()
+        elapsed = time.perf_counter() - start
+        timings.append(elapsed * 1000)
+        spent += elapsed
+        if samples is not None:
+            if len(timings) >= samples:
+                break
+        elif len(timings) >= MAX_SAMPLES or (len(timings) >= MIN_SAMPLES and spent >= TARGET_SECONDS):
+            break
+    timings.sort()
+    return {
+        'samples': len(timings),
+        'p50_ms': round(statistics.median(timings), 6),
+        'p90_ms': round(_percentile(timings, 0.90), 6),
+        'p99_ms': round(_percentile(timings, 0.99), 6),
+        'max_ms': round(timings[-1], 6),
+    }
+
+def complexity_exponent(sizes: Sequence[int], latencies: Sequence[float]) -> Optional[float]:
+    """Least-squares slope of log(latency) over log(size)."""
+    points = [(math.log(size), math.log(latency)) for size, latency in zip(sizes, latencies) if latency > 0]
+    if len(points) < 2:
+        return None
+    mean_x = statistics.fmean(x for x, _ in points)
+    mean_y = statistics.fmean(y for _, y in points)
+    denominator = sum((x - mean_x) ** 2 for x, _ in points)
+    if denominator == 0:
+        return None
+    return round(sum((x - mean_x) * (y - mean_y) for x, y in points) / denominator, 3)
+
+def baseline_workload() -> float:
+    """Fixed pure-Python work (arithmetic, allocation, sorting) that thresholds are relative to."""
+    values = [(i * 7919) % 10_007 / 7.0 for i in range(20_000)]
+    values.sort()
+    return sum(math.exp(-value / 1000) for value in values)
+
+def _series(make_call: Callable[[int], Callable[[], Any]], sizes: Sequence[int],
+            samples: Optional[int] = None) -> Dict[str, Any]:
+    points = {str(size): measure(make_call(size), samples) for size in sizes}
+    return {
+        'sizes': points,
+        'complexity_exponent': complexity_exponent(sizes, [points[str(size)]['p50_ms'] for size in sizes]),
+    }
+
+def bench_matching(pool_sizes: Sequence[int], seed: int) -> Dict[str, Any]:
+    """Time each matching function over the given pool sizes."""
+    rng = random.Random(seed)
+    random.seed(seed)
+    tables = {size: _player_table(rng, size) for size in pool_sizes}
+    functions = {
+        'create_random_match': matching.create_random_match,
+        'create_balanced_match': matching.create_balanced_match,
+        'find_optimal_teams': matching.find_optimal_teams,
+        'create_singles_match': matching.create_singles_match,
+    }
+    return {
+        name: _series(lambda size, function=function: (lambda: function(tables[size])), pool_sizes)
+        for name, function in functions.items()
+    }
+
+def bench_elo(batch_sizes: Sequence[int], seed: int) -> Dict[str, Any]:
+    """Time batches of ELO updates and win probabilities (3 samples per size once batches exceed 100k)."""
+    rng = random.Random(seed)
+    largest = max(batch_sizes)
+    team_ratings = [((rng.gauss(1500, 150), rng.gauss(1500, 150)), (rng.gauss(1500, 150), rng.gauss(1500, 150)))
+                    for _ in range(min(largest, 10_000))]
+    outcomes = [rng.random() < 0.5 for _ in range(len(team_ratings))]
+
+    def update_batch(size: int) -> Callable[[], None]:
+        def run() -> None:
+            count = len(team_ratings)
+            for i in range(size):
+                team1, team2 = team_ratings[i % count]
+                elo.update_doubles_elo(team1, team2, outcomes[i % count])
+        return run
+
+    def probability_batch(size: int) -> Callable[[], None]:
+        def run() -> None:
+            count = len(team_ratings)
+            for i in range(size):
+                team1, team2 = team_ratings[i % count]
+                elo.calculate_win_probability(team1, team2)
+        return run
+
+    samples = 3 if largest > 100_000 else None
+    results = {
+        'update_doubles_elo': _series(update_batch, batch_sizes, samples),
+        'calculate_win_probability': _series(probability_batch, batch_sizes, samples),
+    }
+    for series in results.values():
+        for size, point in series['sizes'].items():
+            point['ns_per_call'] = round(point['p50_ms'] * 1e6 / int(size), 1)
+    return results
+
+def run(pool_sizes: Sequence[int] = POOL_SIZES, batch_sizes: Sequence[int] = BATCH_SIZES,
+        seed: int = DEFAULT_SEED) -> Dict[str, Any]:
+    """Run the baseline and both suites and return the JSON-ready report."""
+    return {
+        'meta': {
+            'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'seed': seed,
+        },
+        'baseline': measure(baseline_workload),
+        'matching': bench_matching(pool_sizes, seed),
+        'elo': bench_elo(batch_sizes, seed),
+    }
+
+def _medians(report: Dict[str, Any]) -> Dict[str, float]:
+    """Flatten a report to {'function[size]': p50_ms}."""
+    medians = {}
+    for suite in ('matching', 'elo'):
+        for function, series in report[suite].items():
+            for size, point in series['sizes'].items():
+                medians[f"{function}[{size}]"] = point['p50_ms']
+    return medians
+
+def check_thresholds(report: Dict[str, Any], thresholds: Dict[str, float]) -> List[str]:
+    """Return a message for every measured median above its threshold, scaled by this run's baseline."""
+    baseline = report['baseline']['p50_ms']
+    failures = []
+    for key, median in _medians(report).items():
+        ratio = thresholds.get(key)
+        if ratio is None:
+            continue
+        limit = max(ratio * baseline, MIN_THRESHOLD_MS)
+        if median > limit:
+            failures.append(f"{key}: {median:.3f} ms > threshold {limit:.3f} ms "
+                            f"({median / baseline:.3f}x > {ratio:.3f}x baseline)")
+    return failures
+
+def thresholds_from(report: Dict[str, Any], headroom: float = DEFAULT_HEADROOM) -> Dict[str, float]:
+    """Medians x headroom, as multiples of the baseline median."""
+    baseline = report['baseline']['p50_ms']
+    return {key: round(median * headroom / baseline, 6) for key, median in _medians(report).items()}
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark matching and ELO algorithms.")
+    parser.add_argument("--pool-sizes", type=int, nargs="+", default=POOL_SIZES)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", help=f"Default: {BATCH_SIZES} ({FULL_BATCH_SIZES} with --full)")
+    parser.add_argument("--full", action="store_true", help="Include the 1M ELO batches")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--output", type=Path, help="Write the JSON report here (default: stdout)")
+    parser.add_argument("--check", action="store_true", help="Fail if a median exceeds its stored threshold")
+    parser.add_argument("--update-thresholds", action="store_true", help="Store medians x headroom as the new thresholds")
+    parser.add_argument("--headroom", type=float, default=DEFAULT_HEADROOM)
+    parser.add_argument("--thresholds", type=Path, default=THRESHOLDS_PATH)
+    args = parser.parse_args(argv)
+
+    batch_sizes = args.batch_sizes or (FULL_BATCH_SIZES if args.full else BATCH_SIZES)
+    report = run(args.pool_sizes, batch_sizes, args.seed)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n")
+    else:
+        print(text)
+
+    if args.update_thresholds:
+        args.thresholds.write_text(json.dumps(thresholds_from(report, args.headroom), indent=2, sort_keys=True) + "\n")
+        print(f"Thresholds written to {args.thresholds}", file=sys.stderr)
+
+    if args.check:
+        thresholds = json.loads(args.thresholds.read_text())
+        failures = check_thresholds(report, thresholds)
+        for failure in failures:
+            print(f"REGRESSION {failure}", file=sys.stderr)
+        if failures:
+            return 1
+        print("All functions within thresholds", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
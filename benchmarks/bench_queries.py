@@ -0,0 +1,271 @@
+"""
+Benchmark every public function in db.queries at several data scales.
+
+Each scale gets a freshly generated synthetic database (see
+benchmarks.synthetic). Reads run first, then writes, then deletes, so the
+read timings are taken on the untouched data. Results are reported as
+JSON with min/median/mean/p95/max milliseconds per function.
+
+Usage:
+    python -m benchmarks.bench_queries --scales 1x 10x --output results.json
+"""
+import argparse
+import inspect
+import json
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from db import database, queries
+from db.models import Match, User, MATCH_STATUS_COMPLETED, MATCH_STATUS_ONGOING
+from benchmarks.synthetic import DEFAULT_SEED, SCALES, generate
+
+DEFAULT_REPEAT = 20
+
+@dataclass
+class BenchContext:
+    """Ids sampled from the generated database, shared by the case factories."""
+    rng: random.Random
+    user_ids: List[int]
+    match_ids: List[int]
+    ongoing_match_ids: List[int]
+    display_names: List[str]
+    deletable_ids: List[int] = field(default_factory=list)
+
+    def user_id(self) -> int:
+        return self.rng.choice(self.user_ids)
+
+    def users(self, count: int) -> List[int]:
+        return self.rng.sample(self.user_ids, min(count, len(self.user_ids)))
+
+    def match_id(self) -> int:
+        return self.rng.choice(self.match_ids)
+
+@dataclass
+class Case:
+    kind: str  # 'read', 'write' or 'delete'; run in that order
+    make: Callable[[BenchContext], Callable[[], Any]]
+
+def _new_match(ctx: BenchContext) -> Match:
+    players = ctx.users(4)
+    return Match(side_1_user_1_id=players[0], side_1_user_2_id=players[1],
+                 side_2_user_1_id=players[2], side_2_user_2_id=players[3])
+
+def _claim_new_match(ctx: BenchContext) -> int:
+    # Make the players available first so the claim succeeds
+    match = _new_match(ctx)
+    queries.add_players_to_available([match.side_1_user_1_id, match.side_1_user_2_id,
+                                      match.side_2_user_1_id, match.side_2_user_2_id])
+    return queries.claim_and_create_match(match)
+
+def _play_matches(user_ids: List[int]) -> None:
+    """Give players match history in every slot, so deletes run on players who have played."""
+    for i in range(0, len(user_ids) - 3, 4):
+        a, b, c, d = user_ids[i:i + 4]
+        match_id = queries.create_match(Match(side_1_user_1_id=a, side_1_user_2_id=b,
+                                               side_2_user_1_id=c, side_2_user_2_id=d))
+        queries.update_match_score(match_id, 21, 15, 18, 21, 21, 19)
+
+def _pop_deletable(ctx: BenchContext, count: int) -> List[int]:
+    ids = ctx.deletable_ids[:count]
+    del ctx.deletable_ids[:count]
+    return ids
+
+# One case per public query function: the factory returns the call to time
+CASES: Dict[str, Case] = {
+    # Users
+    'get_all_users': Case('read', lambda ctx: queries.get_all_users),
+    'search_users': Case('read', lambda ctx: lambda: queries.search_users(ctx.rng.choice(ctx.display_names)[:2])),
+    'get_user_by_id': Case('read', lambda ctx: lambda: queries.get_user_by_id(ctx.user_id())),
+    'get_user_ids_by_display_name': Case('read', lambda ctx: lambda: queries.get_user_ids_by_display_name(ctx.rng.sample(ctx.display_names, 20))),
+    'count_users': Case('read', lambda ctx: queries.count_users),
+    'get_users_page': Case('read', lambda ctx: lambda: queries.get_users_page(25, ctx.rng.randrange(max(len(ctx.user_ids) - 25, 1)))),
+    'iter_users': Case('read', lambda ctx: queries.iter_users),
+    # Availability
+    'get_all_availables': Case('read', lambda ctx: queries.get_all_availables),
+    'get_all_unavailables': Case('read', lambda ctx: queries.get_all_unavailables),
+    'get_availability_board': Case('read', lambda ctx: queries.get_availability_board),
+    'get_player_availability': Case('read', lambda ctx: lambda: queries.get_player_availability(ctx.user_id())),
+    'get_available_players': Case('read', lambda ctx: queries.get_available_players),
+    'get_available_player_table': Case('read', lambda ctx: queries.get_available_player_table),
+    'get_player_table': Case('read', lambda ctx: lambda: queries.get_player_table(ctx.users(4))),
+    'load_available_state': Case('read', lambda ctx: queries.load_available_state),
+    # Matches
+    'get_all_matches': Case('read', lambda ctx: queries.get_all_matches),
+    'get_match': Case('read', lambda ctx: lambda: queries.get_match(ctx.match_id())),
+    'get_matches_by_status': Case('read', lambda ctx: lambda: queries.get_matches_by_status(MATCH_STATUS_ONGOING)),
+    'count_matches_by_status': Case('read', lambda ctx: queries.count_matches_by_status),
+    'get_match_players': Case('read', lambda ctx: lambda: queries.get_match_players(ctx.match_id())),
+    'iter_matches': Case('read', lambda ctx: lambda: queries.iter_matches(MATCH_STATUS_COMPLETED)),
+    # Elo
+    'get_all_elos': Case('read', lambda ctx: queries.get_all_elos),
+    'get_player_elo_history': Case('read', lambda ctx: lambda: queries.get_player_elo_history(ctx.user_id())),
+    'get_players_elo_history': Case('read', lambda ctx: lambda: queries.get_players_elo_history(ctx.users(5))),
+    'iter_elo_history': Case('read', lambda ctx: queries.iter_elo_history),
+    # Pair statistics
+    'get_head_to_head': Case('read', lambda ctx: lambda: queries.get_head_to_head(*ctx.users(2))),
+    'get_partnership': Case('read', lambda ctx: lambda: queries.get_partnership(*ctx.users(2))),
+    'get_best_partners': Case('read', lambda ctx: lambda: queries.get_best_partners(ctx.user_id())),
+    # Exports
+    'export_matches': Case('read', lambda ctx: queries.export_matches),
+    'export_elo_history': Case('read', lambda ctx: queries.export_elo_history),
+    'export_ratings': Case('read', lambda ctx: queries.export_ratings),
+    # Writes
+    'create_user': Case('write', lambda ctx: lambda: queries.create_user(User(display_name="Bench Player"))),
+    'create_users': Case('write', lambda ctx: lambda: queries.create_users(
+        [User(display_name=f"Bench {n}") for n in range(100)], [1500.0] * 100, "Benchmark")),
+    'update_user': Case('write', lambda ctx: lambda: queries.update_user(User(id=ctx.user_id(), display_name="Renamed"))),
+    'update_users': Case('write', lambda ctx: lambda: queries.update_users(
+        [User(id=user_id, display_name="Renamed") for user_id in ctx.users(25)])),
+    'apply_player_edits': Case('write', lambda ctx: lambda: queries.apply_player_edits(
+        [User(id=user_id, display_name="Edited") for user_id in ctx.users(10)],
+        [(user_id, ctx.rng.uniform(1200, 1800), "Benchmark") for user_id in ctx.users(10)])),
+    'toggle_availability': Case('write', lambda ctx: lambda: queries.toggle_availability(ctx.user_id())),
+    'set_availability': Case('write', lambda ctx: lambda: queries.set_availability(ctx.users(10), ctx.users(10))),
+    'save_available_state': Case('write', lambda ctx: queries.save_available_state),
+    'create_match': Case('write', lambda ctx: lambda: queries.create_match(_new_match(ctx))),
+    'claim_and_create_match': Case('write', lambda ctx: lambda: _claim_new_match(ctx)),
+    'update_match_score': Case('write', lambda ctx: lambda: queries.update_match_score(
+        ctx.rng.choice(ctx.ongoing_match_ids), 21, ctx.rng.randint(5, 19), 21, ctx.rng.randint(5, 19), 0, 0)),
+    'update_elo': Case('write', lambda ctx: lambda: queries.update_elo(ctx.user_id(), ctx.rng.uniform(1200, 1800), "Benchmark")),
+    'update_elos': Case('write', lambda ctx: lambda: queries.update_elos(
+        [(user_id, ctx.rng.uniform(1200, 1800), "Benchmark") for user_id in ctx.users(4)])),
+    'remove_players_from_available': Case('write', lambda ctx: lambda: queries.remove_players_from_available(ctx.users(4))),
+    'add_players_to_available': Case('write', lambda ctx: lambda: queries.add_players_to_available(ctx.users(4))),
+    # Deletes use players created (and given match history) for the purpose, so other cases keep their data
+    'delete_user': Case('delete', lambda ctx: lambda: queries.delete_user(_pop_deletable(ctx, 1)[0])),
+    'delete_users': Case('delete', lambda ctx: lambda: queries.delete_users(_pop_deletable(ctx, 10))),
+}
+
+def public_query_functions() -> List[str]:
+    """Names of the public functions defined in db.queries."""
+    return sorted(
+        name for name, member in inspect.getmembers(queries, inspect.isfunction)
+        if not name.startswith('_') and member.__module__ == queries.__name__
+    )
+
+def _consume(result: Any) -> Optional[int]:
+    """Drain lazy results so iterators are timed fully; returns a row count where there is one."""
+    if isinstance(result, tuple) and len(result) == 2 and hasattr(result[1], '__next__'):
+        result = result[1]
+    if hasattr(result, '__next__'):
+        return sum(1 for _ in result)
+    if isinstance(result, dict):
+        return None
+    try:
+        return len(result)
+    except TypeError:
+        return None
+
+def time_call(call: Callable[[], Any], repeat: int, warmup: int = 1) -> Dict[str, Any]:
+    """Time `repeat` calls after `warmup` untimed ones; milliseconds."""
+    for _ in range(warmup):
+        _consume(call())
+    timings = []
+    rows = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = _consume(call())
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        'repeat': repeat,
+        'min_ms': round(timings[0], 4),
+        'median_ms': round(statistics.median(timings), 4),
+        'mean_ms': round(statistics.fmean(timings), 4),
+        'p95_ms': round(timings[min(int(len(timings) * 0.95), len(timings) - 1)], 4),
+        'max_ms': round(timings[-1], 4),
+        'rows': rows,
+    }
+
+def _context(seed: int) -> BenchContext:
+    conn = database.get_connection()
+    user_ids = [row[0] for row in conn.execute("SELECT id FROM users")]
+    match_ids = [row[0] for row in conn.execute("SELECT id FROM matches")]
+    ongoing = [row[0] for row in conn.execute("SELECT id FROM matches WHERE status = ?", (MATCH_STATUS_ONGOING,))]
+    names = [row[0] for row in conn.execute("SELECT display_name FROM users")]
+    conn.close()
+    return BenchContext(random.Random(seed), user_ids, match_ids, ongoing or match_ids, names)
+
+def run_scale(name: str, path: Path, repeat: int, seed: int,
+              only: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Generate the database for one scale and time every selected case on it."""
+    config = SCALES[name]
+    counts = generate(path, config)
+    ctx = _context(seed)
+
+    names = [case for case in public_query_functions() if only is None or case in only]
+    order = {'read': 0, 'write': 1, 'delete': 2}
+    results: Dict[str, Any] = {}
+    for function_name in sorted((n for n in names if n in CASES), key=lambda n: (order[CASES[n].kind], n)):
+        case = CASES[function_name]
+        if case.kind == 'delete' and not ctx.deletable_ids:
+            # Players that only exist to be deleted, created after the reads
+            ctx.deletable_ids = queries.create_users(
+                [User(display_name=f"Delete Me {n}") for n in range((repeat + 1) * 11)]
+            )
+            _play_matches(ctx.deletable_ids)
+        results[function_name] = {'kind': case.kind, **time_call(case.make(ctx), repeat)}
+
+    return {
+        'config': asdict(config),
+        'rows': counts,
+        'results': results,
+        'missing_cases': [n for n in names if n not in CASES],
+    }
+
+def run(scales: List[str], repeat: int = DEFAULT_REPEAT, seed: int = DEFAULT_SEED,
+        workdir: Optional[Path] = None, only: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Run the suite at each scale and return the JSON-ready report."""
+    original_path = database.DB_PATH
+    report: Dict[str, Any] = {
+        'meta': {
+            'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'repeat': repeat,
+            'seed': seed,
+        },
+        'scales': {},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = Path(workdir or tmp)
+        try:
+            for name in scales:
+                report['scales'][name] = run_scale(name, directory / f"bench_{name}.db", repeat, seed, only)
+        finally:
+            database.set_db_path(original_path)
+    return report
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark db.queries on synthetic data.")
+    parser.add_argument("--scales", nargs="+", choices=list(SCALES), default=['1x', '10x'])
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--only", nargs="+", help="Only benchmark these query functions")
+    parser.add_argument("--workdir", type=Path, help="Keep the generated databases here instead of a temp dir")
+    parser.add_argument("--output", type=Path, help="Write the JSON report here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    report = run(args.scales, args.repeat, args.seed, args.workdir, args.only)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n")
+    else:
+        print(text)
+
+    for name, scale in report['scales'].items():
+        if scale['missing_cases']:
+            print(f"[{name}] no benchmark case for: {', '.join(scale['missing_cases'])}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,347 @@
+"""
+Headless multi-session load test for the Streamlit pages.
+
+Runs N concurrent club-night sessions against one synthetic database, each
+an AppTest in its own process (AppTest keeps testing state per process, so
+sessions cannot share one). Each session performs a random mix of actions
+(toggle availability, create a match, save a score, view stats) and the run
+reports per-action latency percentiles plus SQLite contention.
+
+Contention is measured with an instrumented connection: SQLite's own busy
+handler is disabled (timeout=0) and replaced by a retry loop with the same
+deadline, so every "database is locked" retry (a busy wait) and every
+statement that still fails after the deadline (a lock error) is counted.
+
+Usage:
+    python -m benchmarks.load_test --sessions 8 --actions 30 --output load.json
+"""
+import argparse
+import json
+import multiprocessing
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from streamlit.testing.v1 import AppTest
+
+from db import database
+from benchmarks.synthetic import DEFAULT_SEED, SCALES, generate
+
+APP_PATH = str(Path(__file__).resolve().parent.parent / "app.py")
+
+# Same deadline as sqlite3.connect's default timeout
+DEFAULT_BUSY_TIMEOUT = 5.0
+BUSY_RETRY_SLEEP = 0.005
+
+# Relative frequency of each action during a club night
+ACTION_WEIGHTS = {
+    'toggle_availability': 45,
+    'view_stats': 25,
+    'save_score': 15,
+    'create_match': 15,
+}
+
+@dataclass
+class ContentionStats:
+    statements: int = 0
+    busy_waits: int = 0
+    busy_wait_seconds: float = 0.0
+    lock_errors: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, retries: int, waited: float, failed: bool) -> None:
+        with self._lock:
+            self.statements += 1
+            self.busy_waits += retries
+            self.busy_wait_seconds += waited
+            if failed:
+                self.lock_errors += 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'statements': self.statements,
+            'busy_waits': self.busy_waits,
+            'busy_wait_seconds': round(self.busy_wait_seconds, 4),
+            'lock_errors': self.lock_errors,
+        }
+
+# Shared by every instrumented connection in a session process
+contention = ContentionStats()
+busy_timeout = DEFAULT_BUSY_TIMEOUT
+
+def _is_busy(error: sqlite3.OperationalError) -> bool:
+    message = str(error)
+    return 'database is locked' in message or 'database is busy' in message
+
+def _with_retry(call: Callable[[], Any]) -> Any:
+    """Run a statement, retrying while the database is locked, and record the contention."""
+    retries = 0
+    started = None
+    while True:
+        try:
+            result = call()
+        except sqlite3.OperationalError as e:
+            if not _is_busy(e):
+                raise
+            now = time.perf_counter()
+            started = started if started is not None else now
+            if now - started >= busy_timeout:
+                contention.record(retries, now - started, failed=True)
+                raise
+            retries += 1
+            time.sleep(BUSY_RETRY_SLEEP)
+            continue
+        contention.record(retries, time.perf_counter() - started if started is not None else 0.0, failed=False)
+        return result
+
+class CountingCursor(sqlite3.Cursor):
+    def execute(self, sql, parameters=()):
+        return _with_retry(lambda: sqlite3.Cursor.execute(self, sql, parameters))
+
+    def executemany(self, sql, seq_of_parameters):
+        # Materialize so a retry replays the same rows (a busy error hits on the first write)
+        rows = list(seq_of_parameters)
+        return _with_retry(lambda: sqlite3.Cursor.executemany(self, sql, rows))
+
+    def executescript(self, sql_script):
+        return _with_retry(lambda: sqlite3.Cursor.executescript(self, sql_script))
+
+class CountingConnection(sqlite3.Connection):
+    """Connection whose busy handling is done (and counted) in Python."""
+
+    def __init__(self, *args, **kwargs):
+        kwargs['timeout'] = 0
+        super().__init__(*args, **kwargs)
+
+    def cursor(self, factory=CountingCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+    def commit(self):
+        return _with_retry(lambda: sqlite3.Connection.commit(self))
+
+@dataclass
+class ActionResult:
+    action: str
+    seconds: float
+    error: Optional[str] = None
+
+class ClubSession:
+    """One simulated user: an AppTest session driving the pages."""
+
+    def __init__(self, rng: random.Random, timeout: float):
+        self.rng = rng
+        self.at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+        self.page = None
+
+    def _goto(self, page: str) -> None:
+        if self.page != page:
+            self.at.session_state['page'] = page
+            self.at.run()
+            self.page = page
+
+    def _buttons(self, key_prefix: str) -> List[Any]:
+        return [button for button in self.at.button if button.key and button.key.startswith(key_prefix)]
+
+    def open_app(self) -> None:
+        self.at.run()
+        self.page = self.at.session_state['page']
+
+    def toggle_availability(self) -> None:
+        self._goto('available')
+        buttons = self._buttons('make_available_') + self._buttons('make_unavailable_')
+        if buttons:
+            self.rng.choice(buttons).click().run()
+
+    def view_stats(self) -> None:
+        self.page = None
+        self._goto('stats')
+
+    def create_match(self) -> None:
+        self._goto('matches')
+        buttons = [button for button in self.at.button if button.label == "Create Match"]
+        if buttons:
+            buttons[0].click().run()
+
+    def save_score(self) -> None:
+        self._goto('matches')
+        buttons = self._buttons('save_score_')
+        if not buttons:
+            return
+        button = self.rng.choice(buttons)
+        match_id = button.key[len('save_score_'):]
+        winner_first = self.rng.random() < 0.5
+        for n in (1, 2):
+            loser = self.rng.randint(5, 19)
+            scores = (21, loser) if winner_first else (loser, 21)
+            for side, score in zip((1, 2), scores):
+                self.at.number_input(key=f"match_{match_id}_set{n}_team{side}").set_value(score)
+        button.click().run()
+
+    def perform(self, action: str) -> ActionResult:
+        start = time.perf_counter()
+        error = None
+        try:
+            getattr(self, action)()
+            if self.at.exception:
+                error = self.at.exception[0].value
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        return ActionResult(action, time.perf_counter() - start, error)
+
+def _percentiles(seconds: Sequence[float]) -> Dict[str, float]:
+    values = sorted(value * 1000 for value in seconds)
+    pick = lambda fraction: values[min(int(len(values) * fraction), len(values) - 1)]
+    return {
+        'count': len(values),
+        'p50_ms': round(statistics.median(values), 2),
+        'p90_ms': round(pick(0.90), 2),
+        'p99_ms': round(pick(0.99), 2),
+        'max_ms': round(values[-1], 2),
+    }
+
+def _session_process(index: int, actions: int, seed: int, think_time: float, timeout: float,
+                     busy_timeout_seconds: float, database_path: str, barrier: Any, queue: Any) -> None:
+    """Entry point of one session process; puts (results, contention, start, end) on the queue."""
+    global busy_timeout
+    busy_timeout = busy_timeout_seconds
+    database.set_db_path(database_path)
+    database.set_connection_factory(CountingConnection)
+
+    rng = random.Random(seed * 1000 + index)
+    session = ClubSession(rng, timeout)
+    names = list(ACTION_WEIGHTS)
+    weights = list(ACTION_WEIGHTS.values())
+    results = []
+    started = time.time()
+    try:
+        barrier.wait()
+        started = time.time()
+        results.append(session.perform('open_app'))
+        for _ in range(actions):
+            if think_time > 0:
+                time.sleep(rng.expovariate(1 / think_time))
+            results.append(session.perform(rng.choices(names, weights)[0]))
+    finally:
+        queue.put(([asdict(result) for result in results], contention.as_dict(), started, time.time()))
+
+def run(sessions: int = 4, actions: int = 20, scale: str = '1x', seed: int = DEFAULT_SEED,
+        think_time: float = 0.0, timeout: float = 60.0,
+        busy_timeout_seconds: float = DEFAULT_BUSY_TIMEOUT,
+        database_path: Optional[Path] = None) -> Dict[str, Any]:
+    """
+    Run the load test and return the JSON-ready report.
+
+    Args:
+        sessions: Concurrent sessions (processes)
+        actions: Actions per session, after opening the app
+        scale: Synthetic data scale for a freshly generated database
+        seed: Seed for data generation and action choice
+        think_time: Mean pause between a session's actions, in seconds
+        timeout: AppTest script timeout per run, in seconds
+        busy_timeout_seconds: How long a statement retries on a locked database
+        database_path: Where to generate the database (temp dir when None)
+    """
+    original_path = database.DB_PATH
+    context = multiprocessing.get_context('spawn')
+    results: List[ActionResult] = []
+    totals = ContentionStats()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = database_path or Path(tmp) / "load_test.db"
+        try:
+            rows = generate(path, SCALES[scale])
+        finally:
+            database.set_db_path(original_path)
+
+        # All sessions start their first action together
+        barrier = context.Barrier(sessions)
+        queue = context.Queue()
+        processes = [
+            context.Process(target=_session_process,
+                            args=(i, actions, seed, think_time, timeout, busy_timeout_seconds,
+                                  str(path), barrier, queue))
+            for i in range(sessions)
+        ]
+        for process in processes:
+            process.start()
+        starts, ends = [], []
+        for _ in processes:
+            session_results, session_contention, started, ended = queue.get()
+            results.extend(ActionResult(**result) for result in session_results)
+            totals.statements += session_contention['statements']
+            totals.busy_waits += session_contention['busy_waits']
+            totals.busy_wait_seconds += session_contention['busy_wait_seconds']
+            totals.lock_errors += session_contention['lock_errors']
+            starts.append(started)
+            ends.append(ended)
+        for process in processes:
+            process.join()
+    wall_seconds = max(ends) - min(starts)
+
+    by_action: Dict[str, List[ActionResult]] = {}
+    for result in results:
+        by_action.setdefault(result.action, []).append(result)
+
+    errors = [result for result in results if result.error]
+    return {
+        'meta': {
+            'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+        },
+        'config': {
+            'sessions': sessions, 'actions': actions, 'scale': scale, 'seed': seed,
+            'think_time': think_time, 'busy_timeout': busy_timeout_seconds, 'rows': rows,
+        },
+        'wall_seconds': round(wall_seconds, 3),
+        'actions_per_second': round(len(results) / wall_seconds, 2) if wall_seconds else None,
+        'actions': {
+            action: {**_percentiles([r.seconds for r in items]),
+                     'errors': sum(1 for r in items if r.error)}
+            for action, items in sorted(by_action.items())
+        },
+        'database': totals.as_dict(),
+        'errors': [asdict(result) for result in errors[:20]],
+    }
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Multi-session load test of the Streamlit pages.")
+    parser.add_argument("--sessions", type=int, default=4)
+    parser.add_argument("--actions", type=int, default=20, help="Actions per session")
+    parser.add_argument("--scale", choices=list(SCALES), default='1x')
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--think-time", type=float, default=0.0, help="Mean seconds between actions")
+    parser.add_argument("--busy-timeout", type=float, default=DEFAULT_BUSY_TIMEOUT)
+    parser.add_argument("--timeout", type=float, default=60.0, help="AppTest timeout per script run")
+    parser.add_argument("--database", type=Path, help="Generate the database here instead of a temp dir")
+    parser.add_argument("--output", type=Path, help="Write the JSON report here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    report = run(args.sessions, args.actions, args.scale, args.seed, args.think_time,
+                 args.timeout, args.busy_timeout, args.database)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n")
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    main()
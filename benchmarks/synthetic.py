@@ -0,0 +1,245 @@
+"""
+Synthetic club data for benchmarks.
+
+Fills a scratch database with users, ratings, matches and ELO history drawn
+from fixed-seed distributions: ratings are roughly normal around 1500,
+player activity is heavy-tailed (a few regulars play most matches), most
+matches are doubles and set scores follow badminton rules up to 30.
+
+Usage:
+    python -m benchmarks.synthetic --output /tmp/club.db --users 1500 --matches 30000
+"""
+import argparse
+import os
+import random
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from db import database, pairs
+from db.models import MatchOutcome, MATCH_STATUS_ONGOING
+
+DEFAULT_SEED = 42
+
+FIRST_NAMES = [
+    "Aiden", "Alice", "Amir", "Ana", "Ben", "Chloe", "Chen", "Daniel", "Elena", "Ethan",
+    "Fatima", "Grace", "Hana", "Hugo", "Isaac", "Jason", "Julia", "Kenji", "Lena", "Liam",
+    "Maya", "Mei", "Noah", "Olivia", "Omar", "Priya", "Quinn", "Ravi", "Sara", "Theo",
+    "Uma", "Victor", "Wei", "Yara", "Zoe",
+]
+
+LAST_NAMES = [
+    "Anders", "Brown", "Chan", "Dubois", "Evans", "Fischer", "Garcia", "Hughes", "Ito", "Jensen",
+    "Kim", "Lopez", "Martin", "Nguyen", "Okafor", "Patel", "Rossi", "Schmidt", "Tanaka", "Wong",
+]
+
+@dataclass
+class SyntheticConfig:
+    users: int = 150
+    matches: int = 3000
+    elo_history: int = 12000
+    available_fraction: float = 0.15
+    unrated_fraction: float = 0.05
+    doubles_fraction: float = 0.8
+    ongoing_matches: int = 4
+    days: int = 365
+    seed: int = DEFAULT_SEED
+
+    def scaled(self, factor: int) -> "SyntheticConfig":
+        """Same club, with factor times the users, matches and history."""
+        return SyntheticConfig(**{
+            **asdict(self),
+            'users': self.users * factor,
+            'matches': self.matches * factor,
+            'elo_history': self.elo_history * factor,
+            'ongoing_matches': self.ongoing_matches * factor,
+        })
+
+# Named scales relative to a typical club
+SCALES: Dict[str, SyntheticConfig] = {
+    '1x': SyntheticConfig(),
+    '10x': SyntheticConfig().scaled(10),
+    '100x': SyntheticConfig().scaled(100),
+}
+
+def _set_scores(rng: random.Random, winner: int) -> Tuple[int, int]:
+    """Scores of one set won by side `winner` (rally scoring to 21, deuce up to 30)."""
+    if rng.random() < 0.12:
+        # Deuce: win by two, or 30-29 at the cap
+        loser_score = rng.randint(20, 29)
+        winner_score = 30 if loser_score == 29 else loser_score + 2
+    else:
+        winner_score = 21
+        loser_score = min(int(rng.triangular(4, 20, 16)), 19)
+    return (winner_score, loser_score) if winner == 1 else (loser_score, winner_score)
+
+def _match_scores(rng: random.Random, side_1_rating: float, side_2_rating: float) -> List[int]:
+    """Six set scores for a best-of-three match; unplayed sets are 0-0."""
+    side_1_win_probability = 1 / (1 + 10 ** ((side_2_rating - side_1_rating) / 400))
+    scores: List[int] = []
+    sets_won = {1: 0, 2: 0}
+    for _ in range(3):
+        if max(sets_won.values()) == 2:
+            scores.extend((0, 0))
+            continue
+        winner = 1 if rng.random() < side_1_win_probability else 2
+        sets_won[winner] += 1
+        scores.extend(_set_scores(rng, winner))
+    return scores
+
+def _pick_players(rng: random.Random, user_ids: List[int], cumulative_weights: List[float], count: int) -> List[int]:
+    """Pick `count` distinct players, weighted by activity."""
+    picked: List[int] = []
+    while len(picked) < count:
+        user_id = rng.choices(user_ids, cum_weights=cumulative_weights)[0]
+        if user_id not in picked:
+            picked.append(user_id)
+    return picked
+
+def _timestamps(rng: random.Random, count: int, start: datetime, days: int) -> List[str]:
+    """Sorted random timestamps within `days` after start."""
+    seconds = sorted(rng.randrange(days * 86400) for _ in range(count))
+    return [(start + timedelta(seconds=offset)).strftime('%Y-%m-%d %H:%M:%S') for offset in seconds]
+
+def generate(path, config: Optional[SyntheticConfig] = None) -> Dict[str, int]:
+    """
+    Create (or replace) a database at `path` filled with synthetic club data.
+
+    Args:
+        path: Database file to write; an existing file is removed first
+        config: Sizes and distributions (defaults to the 1x scale)
+
+    Returns:
+        Row counts per table
+    """
+    config = config or SyntheticConfig()
+    rng = random.Random(config.seed)
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.exists():
+        os.remove(path)
+
+    database.set_db_path(path)
+    database.init_db()
+
+    conn = database.get_connection()
+    cursor = conn.cursor()
+    start = datetime(2024, 1, 1)
+
+    # Users: common first names with a last name, so display names collide like real clubs
+    users = []
+    for _ in range(config.users):
+        first_name = rng.choice(FIRST_NAMES)
+        last_name = rng.choice(LAST_NAMES)
+        display_name = first_name if rng.random() < 0.3 else f"{first_name} {last_name[0]}."
+        users.append((display_name, first_name, last_name))
+    cursor.executemany("INSERT INTO users (display_name, first_name, last_name) VALUES (?, ?, ?)", users)
+    user_ids = [row[0] for row in cursor.execute("SELECT id FROM users ORDER BY id")]
+
+    # Underlying skill and heavy-tailed activity per player
+    skill = {user_id: min(max(rng.gauss(1500, 150), 1000), 2200) for user_id in user_ids}
+    activity = [rng.paretovariate(1.5) for _ in user_ids]
+    cumulative_weights = []
+    total = 0.0
+    for weight in activity:
+        total += weight
+        cumulative_weights.append(total)
+
+    # Matches: mostly doubles, scores driven by the players' skill
+    match_rows = []
+    match_timestamps = _timestamps(rng, config.matches, start, config.days)
+    ongoing_from = config.matches - min(config.ongoing_matches, config.matches)
+    for i, timestamp in enumerate(match_timestamps):
+        doubles = rng.random() < config.doubles_fraction
+        players = _pick_players(rng, user_ids, cumulative_weights, 4 if doubles else 2)
+        side_1 = players[:len(players) // 2]
+        side_2 = players[len(players) // 2:]
+        if i >= ongoing_from:
+            scores = [None] * 6
+        else:
+            scores = _match_scores(rng, sum(skill[p] for p in side_1) / len(side_1),
+                                   sum(skill[p] for p in side_2) / len(side_2))
+        outcome = MatchOutcome.from_scores(*scores)
+        match_rows.append((
+            side_1[0], side_1[1] if doubles else None,
+            side_2[0], side_2[1] if doubles else None,
+            *scores, timestamp,
+            outcome.side_1_sets, outcome.side_2_sets, outcome.winner_side, outcome.status,
+        ))
+    cursor.executemany("""
+        INSERT INTO matches (
+            side_1_user_1_id, side_1_user_2_id, side_2_user_1_id, side_2_user_2_id,
+            set_1_side_1_score, set_1_side_2_score, set_2_side_1_score, set_2_side_2_score,
+            set_3_side_1_score, set_3_side_2_score, timestamp,
+            side_1_sets, side_2_sets, winner_side, status
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, match_rows)
+
+    # ELO history: a random walk per player, with more entries for more active players
+    history_owners = rng.choices(user_ids, cum_weights=cumulative_weights, k=config.elo_history)
+    history_timestamps = _timestamps(rng, config.elo_history, start, config.days)
+    current: Dict[int, Optional[float]] = {user_id: None for user_id in user_ids}
+    history_rows = []
+    for n, (user_id, timestamp) in enumerate(zip(history_owners, history_timestamps), start=1):
+        old_elo = current[user_id]
+        if old_elo is None:
+            new_elo = round(skill[user_id], 1)
+            reason = "Bulk import - initial setup"
+        else:
+            change = rng.gauss(0, 12) + (skill[user_id] - old_elo) * 0.02
+            new_elo = round(old_elo + change, 1)
+            reason = f"Match #{n}: {'Victory' if change >= 0 else 'Defeat'}"
+        current[user_id] = new_elo
+        history_rows.append((user_id, old_elo, new_elo, reason, timestamp))
+    cursor.executemany(
+        "INSERT INTO elo_history (user_id, old_elo, new_elo, change_reason, timestamp) VALUES (?, ?, ?, ?, ?)",
+        history_rows
+    )
+
+    # Current ratings end where the history does; a few players stay unrated
+    elo_rows = [
+        (user_id, current[user_id] if current[user_id] is not None else round(skill[user_id], 1))
+        for user_id in user_ids
+        if rng.random() >= config.unrated_fraction
+    ]
+    cursor.executemany("INSERT INTO elos (user_id, elo) VALUES (?, ?)", elo_rows)
+
+    # Tonight's attendance
+    available = rng.sample(user_ids, int(len(user_ids) * config.available_fraction))
+    cursor.executemany("INSERT INTO availables (user_id) VALUES (?)", [(user_id,) for user_id in available])
+
+    pairs.rebuild(cursor)
+    conn.commit()
+
+    counts = {
+        table: cursor.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        for table in ('users', 'matches', 'elos', 'elo_history', 'availables', 'partnerships', 'head_to_head')
+    }
+    conn.execute("ANALYZE")
+    conn.close()
+    return counts
+
+def main(argv: Optional[List[str]] = None) -> None:
+    defaults = SyntheticConfig()
+    parser = argparse.ArgumentParser(description="Generate a synthetic badminton club database.")
+    parser.add_argument("--output", required=True, help="Database file to create (replaced if it exists)")
+    parser.add_argument("--scale", choices=list(SCALES), help="Named scale; overrides the size options")
+    parser.add_argument("--users", type=int, default=defaults.users)
+    parser.add_argument("--matches", type=int, default=defaults.matches)
+    parser.add_argument("--elo-history", type=int, default=defaults.elo_history)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    args = parser.parse_args(argv)
+
+    if args.scale:
+        config = SyntheticConfig(**{**asdict(SCALES[args.scale]), 'seed': args.seed})
+    else:
+        config = SyntheticConfig(users=args.users, matches=args.matches,
+                                 elo_history=args.elo_history, seed=args.seed)
+
+    counts = generate(args.output, config)
+    for table, count in counts.items():
+        print(f"{table}: {count}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Asyncio API over db.queries.
+
+Every public function of db.queries has a coroutine counterpart here with
+the same name and arguments. Calls run on a small thread pool whose threads
+each keep one reusable read connection, so independent fetches overlap
+(sqlite3 releases the GIL while SQLite works) and connection setup is paid
+once per thread rather than once per call. Writes still go through the
+single-writer queue. The iter_* functions return async iterators, and the
+export_* functions (columns, async iterator) pairs, that pull rows from the
+pool in batches on their own connection.
+
+Pool calls run in a copy of the caller's contextvars context, so context
+such as the current trace span (utils.tracing) carries over to the pool
+thread.
+
+Usage:
+    elos, matches = await asyncio.gather(async_queries.get_all_elos(),
+                                         async_queries.get_all_matches())
+
+Synchronous code such as a Streamlit page can use gather() for the same
+effect, and run() puts any other database function (e.g. one from
+db.frames) on the pool.
+
+Environment:
+    BADMINTON_READ_POOL_SIZE   Threads, and read connections, in the pool (default 4)
+"""
+import asyncio
+import contextvars
+import functools
+import inspect
+import itertools
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+from . import database, queries
+from .queries import PlayersUnavailableError
+
+POOL_SIZE = int(os.environ.get("BADMINTON_READ_POOL_SIZE", "4"))
+
+# Rows pulled per pool call when iterating a streaming result
+ITER_BATCH_SIZE = queries.STREAM_BATCH_SIZE
+
+# Functions returning lazy rows, and (columns, lazy rows) pairs, rather than values
+ITER_FUNCTIONS = ('iter_users', 'iter_matches', 'iter_elo_history')
+EXPORT_FUNCTIONS = ('export_matches', 'export_elo_history', 'export_ratings')
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_local = threading.local()
+_pooled_factories: Dict[type, type] = {}
+
+def _pooled_factory(factory: type) -> type:
+    """Subclass of a connection factory whose close() keeps the connection open for reuse."""
+    pooled = _pooled_factories.get(factory)
+    if pooled is None:
+        class PooledConnection(factory):
+            def close(self):
+                # Back to the pool: end any read transaction so the next call sees fresh data
+                if self.in_transaction:
+                    self.rollback()
+
+            def release(self):
+                factory.close(self)
+
+        pooled = _pooled_factories[factory] = PooledConnection
+    return pooled
+
+def _connection() -> sqlite3.Connection:
+    """This pool thread's read connection, reopened if the database or factory changed."""
+    key = (database.DB_PATH, database._connection_factory)
+    conn = getattr(_local, 'connection', None)
+    if conn is not None and _local.key == key:
+        return conn
+    if conn is not None:
+        conn.release()
+    conn = sqlite3.connect(key[0], check_same_thread=False, factory=_pooled_factory(key[1]))
+    conn.row_factory = sqlite3.Row
+    _local.connection, _local.key = conn, key
+    return conn
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=POOL_SIZE, thread_name_prefix="db-read")
+        return _executor
+
+def _call_pooled(function: Callable[..., Any], args: tuple, kwargs: dict) -> Any:
+    with database.pin_connection(_connection()):
+        return function(*args, **kwargs)
+
+async def run(function: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Run a synchronous database function on the pool with a pooled connection."""
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_get_executor(), context.run, _call_pooled, function, args, kwargs)
+
+async def _run_unpooled(function: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    # For lazy results, which keep their connection after the call returns
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_get_executor(), functools.partial(context.run, function, *args, **kwargs))
+
+async def aiterate(iterator: Iterator[Any], batch_size: int = ITER_BATCH_SIZE) -> AsyncIterator[Any]:
+    """Iterate a blocking iterator from async code, fetching batch_size items per pool call."""
+    loop = asyncio.get_running_loop()
+    executor = _get_executor()
+    context = contextvars.copy_context()
+    while True:
+        batch = await loop.run_in_executor(executor, context.run, lambda: list(itertools.islice(iterator, batch_size)))
+        if not batch:
+            return
+        for item in batch:
+            yield item
+
+def gather(*awaitables: Awaitable[Any]) -> List[Any]:
+    """
+    Run awaitables concurrently from synchronous code and return their results.
+
+    Must not be called from a thread that is already running an event loop.
+    """
+    async def _gather() -> List[Any]:
+        return list(await asyncio.gather(*awaitables))
+    return asyncio.run(_gather())
+
+def shutdown() -> None:
+    """Stop the pool threads (their connections close when the threads exit)."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
+
+def _async_query(name: str, function: Callable[..., Any]) -> Callable[..., Any]:
+    # Look the function up on every call so instrumentation wrappers apply
+    if name in ITER_FUNCTIONS:
+        def iterate(*args: Any, **kwargs: Any) -> AsyncIterator[Any]:
+            return aiterate(getattr(queries, name)(*args, **kwargs))
+        return functools.wraps(function)(iterate)
+
+    if name in EXPORT_FUNCTIONS:
+        async def export(*args: Any, **kwargs: Any) -> Tuple[List[str], AsyncIterator[tuple]]:
+            columns, rows = await _run_unpooled(getattr(queries, name), *args, **kwargs)
+            return columns, aiterate(rows)
+        return functools.wraps(function)(export)
+
+    async def call(*args: Any, **kwargs: Any) -> Any:
+        return await run(getattr(queries, name), *args, **kwargs)
+    return functools.wraps(function)(call)
+
+__all__ = ['run', 'aiterate', 'gather', 'shutdown', 'PlayersUnavailableError']
+
+for _name, _member in inspect.getmembers(queries, inspect.isfunction):
+    if not _name.startswith('_') and _member.__module__ == queries.__name__:
+        globals()[_name] = _async_query(_name, _member)
+        __all__.append(_name)
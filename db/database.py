@@ -3,22 +3,81 @@ Database connection and initialization module.
 """
 import os
 import sqlite3
+import threading
 import streamlit as st
+from contextlib import contextmanager
 from pathlib import Path
 
+from . import pairs
+from .models import MatchOutcome
+
 # Define the database path
 DB_PATH = Path("badminton_app/data/puma.db")
 
-def get_connection():
-    """Create a connection to the SQLite database."""
+# sqlite3.Connection subclass used for every connection (see set_connection_factory)
+_connection_factory = sqlite3.Connection
+
+# Connection that get_connection() returns on this thread instead of opening
+# a new one (see pin_connection); used by the read pool in db.async_queries
+_pinned = threading.local()
+
+def get_connection(pooled: bool = True):
+    """
+    Create a connection to the SQLite database.
+    
+    Returns the thread's pinned connection instead, if there is one, unless
+    pooled is False (for callers that change connection settings).
+    """
+    if pooled:
+        conn = getattr(_pinned, 'connection', None)
+        if conn is not None:
+            return conn
+    
     # Ensure data directory exists
     os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
     
     # Connect to database
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False, factory=_connection_factory)
     conn.row_factory = sqlite3.Row  # Return rows as dictionaries
     return conn
 
+@contextmanager
+def pin_connection(conn):
+    """Make get_connection() return conn on this thread inside the block."""
+    previous = getattr(_pinned, 'connection', None)
+    _pinned.connection = conn
+    try:
+        yield conn
+    finally:
+        _pinned.connection = previous
+
+# Dedicated connection used only to read PRAGMA data_version, which changes
+# whenever any other connection commits to the database
+_version_conn = None
+_version_lock = threading.Lock()
+
+def get_data_version() -> int:
+    """Return a number that changes whenever the database content changes."""
+    global _version_conn
+    with _version_lock:
+        if _version_conn is None:
+            _version_conn = get_connection(pooled=False)
+        return _version_conn.execute("PRAGMA data_version").fetchone()[0]
+
+def set_connection_factory(factory=None) -> None:
+    """Use a sqlite3.Connection subclass for new connections (None restores the default)."""
+    global _connection_factory
+    _connection_factory = factory or sqlite3.Connection
+
+def set_db_path(path) -> None:
+    """Point the app at another database file (e.g. a scratch copy for benchmarks)."""
+    global DB_PATH, _version_conn
+    with _version_lock:
+        if _version_conn is not None:
+            _version_conn.close()
+            _version_conn = None
+        DB_PATH = Path(path)
+
 def init_db():
     """Initialize the database schema if it doesn't exist."""
     conn = get_connection()
@@ -34,6 +93,47 @@ def init_db():
     )
     ''')
     
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_display_name ON users(display_name)")
+    
+    # Full-text index over user names, kept in sync with users by triggers
+    cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = 'users_fts'")
+    users_fts_exists = cursor.fetchone()[0] == 1
+    
+    cursor.execute('''
+    CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5(
+        display_name, first_name, last_name,
+        content='users', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='1 2 3'
+    )
+    ''')
+    
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS users_fts_insert AFTER INSERT ON users BEGIN
+        INSERT INTO users_fts (rowid, display_name, first_name, last_name)
+        VALUES (new.id, new.display_name, new.first_name, new.last_name);
+    END
+    ''')
+    
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS users_fts_delete AFTER DELETE ON users BEGIN
+        INSERT INTO users_fts (users_fts, rowid, display_name, first_name, last_name)
+        VALUES ('delete', old.id, old.display_name, old.first_name, old.last_name);
+    END
+    ''')
+    
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS users_fts_update AFTER UPDATE ON users BEGIN
+        INSERT INTO users_fts (users_fts, rowid, display_name, first_name, last_name)
+        VALUES ('delete', old.id, old.display_name, old.first_name, old.last_name);
+        INSERT INTO users_fts (rowid, display_name, first_name, last_name)
+        VALUES (new.id, new.display_name, new.first_name, new.last_name);
+    END
+    ''')
+    
+    if not users_fts_exists:
+        cursor.execute("INSERT INTO users_fts (users_fts) VALUES ('rebuild')")
+    
     # Create matches table
     cursor.execute('''
     CREATE TABLE IF NOT EXISTS matches (
@@ -49,10 +149,28 @@ def init_db():
         set_3_side_1_score INTEGER,
         set_3_side_2_score INTEGER,
         on_court INTEGER,
-        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+        side_1_sets INTEGER,
+        side_2_sets INTEGER,
+        winner_side INTEGER,
+        status TEXT NOT NULL DEFAULT 'ongoing'
     )
     ''')
     
+    # Add derived result columns to databases created before they existed
+    added = [
+        add_column_if_missing(cursor, "matches", "side_1_sets", "INTEGER"),
+        add_column_if_missing(cursor, "matches", "side_2_sets", "INTEGER"),
+        add_column_if_missing(cursor, "matches", "winner_side", "INTEGER"),
+        add_column_if_missing(cursor, "matches", "status", "TEXT NOT NULL DEFAULT 'ongoing'"),
+    ]
+    if any(added):
+        backfill_match_outcomes(cursor)
+    
+    # Partial indexes so ongoing/completed lists are plain indexed reads
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_matches_ongoing ON matches(id) WHERE status = 'ongoing'")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_matches_completed ON matches(id) WHERE status = 'completed'")
+    
     # Create availables table
     cursor.execute('''
     CREATE TABLE IF NOT EXISTS availables (
@@ -70,6 +188,8 @@ def init_db():
     )
     ''')
     
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_elos_user_id ON elos(user_id)")
+    
     # Create elo_history table to track elo changes
     cursor.execute('''
     CREATE TABLE IF NOT EXISTS elo_history (
@@ -81,6 +201,7 @@ def init_db():
         timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
     )
     ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_elo_history_user_time ON elo_history(user_id, timestamp)")
     
     # Create save table
     cursor.execute('''
@@ -90,9 +211,68 @@ def init_db():
     )
     ''')
     
+    # Pre-aggregated pair tables, each pair stored in both directions
+    cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name IN ('partnerships', 'head_to_head')")
+    pair_tables_exist = cursor.fetchone()[0] == 2
+    
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS partnerships (
+        player_id INTEGER NOT NULL,
+        partner_id INTEGER NOT NULL,
+        matches INTEGER NOT NULL DEFAULT 0,
+        wins INTEGER NOT NULL DEFAULT 0,
+        losses INTEGER NOT NULL DEFAULT 0,
+        points_for INTEGER NOT NULL DEFAULT 0,
+        points_against INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (player_id, partner_id)
+    ) WITHOUT ROWID
+    ''')
+    
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS head_to_head (
+        player_id INTEGER NOT NULL,
+        opponent_id INTEGER NOT NULL,
+        matches INTEGER NOT NULL DEFAULT 0,
+        wins INTEGER NOT NULL DEFAULT 0,
+        losses INTEGER NOT NULL DEFAULT 0,
+        points_for INTEGER NOT NULL DEFAULT 0,
+        points_against INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (player_id, opponent_id)
+    ) WITHOUT ROWID
+    ''')
+    
+    if not pair_tables_exist:
+        pairs.rebuild(cursor)
+    
     conn.commit()
     conn.close()
 
+def add_column_if_missing(cursor: sqlite3.Cursor, table: str, column: str, definition: str) -> bool:
+    """Add a column to an existing table. Returns True if the column was added."""
+    cursor.execute(f"PRAGMA table_info({table})")
+    if any(row[1] == column for row in cursor.fetchall()):
+        return False
+    cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+    return True
+
+def backfill_match_outcomes(cursor: sqlite3.Cursor) -> None:
+    """Compute the derived result columns for every existing match."""
+    cursor.execute("""
+        SELECT id, set_1_side_1_score, set_1_side_2_score,
+               set_2_side_1_score, set_2_side_2_score,
+               set_3_side_1_score, set_3_side_2_score
+        FROM matches
+    """)
+    updates = []
+    for row in cursor.fetchall():
+        outcome = MatchOutcome.from_scores(*row[1:])
+        updates.append((outcome.side_1_sets, outcome.side_2_sets,
+                        outcome.winner_side, outcome.status, row[0]))
+    cursor.executemany(
+        "UPDATE matches SET side_1_sets = ?, side_2_sets = ?, winner_side = ?, status = ? WHERE id = ?",
+        updates
+    )
+
 # Initialize the database in the Streamlit app
 def setup_database():
     """Initialize the database when the Streamlit app starts."""
@@ -0,0 +1,82 @@
+"""
+Columnar (pandas) loaders for match results.
+"""
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from .database import get_connection
+from .queries import MATCH_SELECT
+
+SCORE_COLUMNS = [
+    f'set_{n}_side_{side}_score' for n in (1, 2, 3) for side in (1, 2)
+]
+
+# Typed columns so nullable integers don't degrade to float/object
+_MATCH_DTYPES = {
+    'id': 'int64',
+    'side_1_user_1_id': 'Int64',
+    'side_1_user_2_id': 'Int64',
+    'side_2_user_1_id': 'Int64',
+    'side_2_user_2_id': 'Int64',
+    **{column: 'Int64' for column in SCORE_COLUMNS},
+    'side_1_sets': 'Int64',
+    'side_2_sets': 'Int64',
+    'winner_side': 'Int64',
+    'status': 'string',
+}
+
+def load_match_frame(status: Optional[str] = None, team_separator: str = " & ",
+                     limit: Optional[int] = None, offset: int = 0) -> pd.DataFrame:
+    """
+    Load matches (newest first) into a typed DataFrame with result columns.
+
+    Args:
+        status: Only load matches with this status ('ongoing' or 'completed')
+        team_separator: String placed between doubles partners in team labels
+        limit: Maximum number of matches to load (all when None)
+        offset: Number of newest matches to skip, for paging with limit
+
+    Returns:
+        DataFrame with the matches columns plus team_1, team_2,
+        side_1_points, side_2_points and winner
+    """
+    query = MATCH_SELECT
+    params = ()
+    if status is not None:
+        query += " WHERE matches.status = ?"
+        params = (status,)
+    query += " ORDER BY matches.id DESC"
+    if limit is not None:
+        query += " LIMIT ? OFFSET ?"
+        params += (limit, offset)
+
+    conn = get_connection()
+    try:
+        df = pd.read_sql_query(query, conn, params=params, dtype=_MATCH_DTYPES, parse_dates=['timestamp'])
+    finally:
+        conn.close()
+
+    return add_result_columns(df, team_separator)
+
+def _team_label(first: pd.Series, second: pd.Series, separator: str) -> pd.Series:
+    """Join partner names column-wise, leaving singles players on their own."""
+    first = first.fillna("Unknown")
+    return first.where(second.isna(), first + separator + second.fillna(""))
+
+def add_result_columns(df: pd.DataFrame, team_separator: str = " & ") -> pd.DataFrame:
+    """Add team labels, point totals and winner labels to a match frame (vectorized)."""
+    df['team_1'] = _team_label(df['side_1_user_1_display_name'], df['side_1_user_2_display_name'], team_separator)
+    df['team_2'] = _team_label(df['side_2_user_1_display_name'], df['side_2_user_2_display_name'], team_separator)
+
+    df['side_1_points'] = df[[f'set_{n}_side_1_score' for n in (1, 2, 3)]].fillna(0).sum(axis=1).astype('int64')
+    df['side_2_points'] = df[[f'set_{n}_side_2_score' for n in (1, 2, 3)]].fillna(0).sum(axis=1).astype('int64')
+
+    winner_side = df['winner_side'].fillna(0).to_numpy(dtype='int64')
+    df['winner'] = np.select([winner_side == 1, winner_side == 2], ['Team 1', 'Team 2'], default='Draw')
+    return df
+
+def to_records(df: pd.DataFrame) -> list:
+    """Convert a frame to a list of dicts with missing values as None."""
+    return df.astype(object).where(df.notna(), None).to_dict('records')
@@ -0,0 +1,285 @@
+"""
+Optional per-function instrumentation of db.queries.
+
+When enabled (BADMINTON_DB_INSTRUMENT=1, or instrument() called directly)
+every public query function is wrapped to record call count, rows
+returned, wall time and time spent opening connections. Writes run on the
+writer thread (see db.writer) are charged to the call that queued them,
+together with the time they waited in the queue. Calls slower than
+BADMINTON_SLOW_QUERY_MS go to the "badminton.slow_queries" logger together
+with the SQL they ran and its EXPLAIN QUERY PLAN. When disabled nothing is
+wrapped, so there is no overhead.
+
+Environment:
+    BADMINTON_DB_INSTRUMENT    1/true/yes to instrument db.queries on import
+    BADMINTON_SLOW_QUERY_MS    Slow-query threshold in milliseconds (default 100)
+    BADMINTON_SLOW_QUERY_LOG   Also append slow queries to this file
+"""
+import functools
+import inspect
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from types import ModuleType
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from . import database
+from .models import PlayerTable
+
+ENABLED = os.environ.get("BADMINTON_DB_INSTRUMENT", "").lower() in ("1", "true", "yes")
+SLOW_QUERY_MS = float(os.environ.get("BADMINTON_SLOW_QUERY_MS", "100"))
+SLOW_QUERY_LOG = os.environ.get("BADMINTON_SLOW_QUERY_LOG")
+
+# Limits on what a single call keeps for the slow-query log
+MAX_STATEMENTS = 20
+MAX_EXPLAINED = 5
+
+slow_query_logger = logging.getLogger("badminton.slow_queries")
+
+@dataclass(slots=True)
+class QueryRecord:
+    """One instrumented call, passed to listeners when it finishes."""
+    function: str
+    seconds: float = 0.0
+    connect_seconds: float = 0.0
+    queue_seconds: float = 0.0  # waiting in the writer queue
+    rows: Optional[int] = None
+    statements: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+    started_at: float = 0.0  # time.time() when the call started
+    result: Any = None  # return value of eager calls, for listeners
+
+@dataclass(slots=True)
+class QueryStats:
+    calls: int = 0
+    errors: int = 0
+    rows: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+    connect_seconds: float = 0.0
+    queue_seconds: float = 0.0
+    slow_calls: int = 0
+
+_stats: Dict[str, QueryStats] = {}
+_stats_lock = threading.Lock()
+_listeners: List[Callable[[QueryRecord], None]] = []
+_connection_listeners: List[Callable[[float], None]] = []
+_local = threading.local()
+
+def _active() -> Optional[QueryRecord]:
+    """The innermost instrumented call running on this thread, if any."""
+    stack = getattr(_local, 'stack', None)
+    return stack[-1] if stack else None
+
+def current() -> Optional[QueryRecord]:
+    """The instrumented call running on this thread, for work handed to another thread."""
+    return _active()
+
+@contextmanager
+def attach(record: Optional[QueryRecord]) -> Iterator[None]:
+    """Charge connections and statements on this thread to a call made on another one."""
+    if record is None:
+        yield
+        return
+    _push(record)
+    try:
+        yield
+    finally:
+        _pop(record)
+
+def _trace(statement: str) -> None:
+    record = _active()
+    if record is not None and len(record.statements) < MAX_STATEMENTS:
+        record.statements.append(statement)
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Connection that charges its open time and statements to the active call."""
+
+    def __init__(self, *args, **kwargs):
+        start = time.perf_counter()
+        super().__init__(*args, **kwargs)
+        seconds = time.perf_counter() - start
+        record = _active()
+        if record is not None:
+            record.connect_seconds += seconds
+        for listener in list(_connection_listeners):
+            listener(seconds)
+        self.set_trace_callback(_trace)
+
+def add_listener(listener: Callable[[QueryRecord], None]) -> None:
+    """Call listener(record) after every instrumented call."""
+    _listeners.append(listener)
+
+def remove_listener(listener: Callable[[QueryRecord], None]) -> None:
+    if listener in _listeners:
+        _listeners.remove(listener)
+
+def add_connection_listener(listener: Callable[[float], None]) -> None:
+    """Call listener(connect_seconds) whenever an instrumented connection is opened."""
+    _connection_listeners.append(listener)
+
+def get_stats() -> Dict[str, Dict[str, Any]]:
+    """Aggregated stats per function name."""
+    with _stats_lock:
+        return {
+            name: {
+                'calls': stats.calls,
+                'errors': stats.errors,
+                'rows': stats.rows,
+                'total_ms': round(stats.total_seconds * 1000, 3),
+                'mean_ms': round(stats.total_seconds * 1000 / stats.calls, 3) if stats.calls else 0.0,
+                'max_ms': round(stats.max_seconds * 1000, 3),
+                'connect_ms': round(stats.connect_seconds * 1000, 3),
+                'queue_ms': round(stats.queue_seconds * 1000, 3),
+                'slow_calls': stats.slow_calls,
+            }
+            for name, stats in sorted(_stats.items())
+        }
+
+def reset_stats() -> None:
+    with _stats_lock:
+        _stats.clear()
+
+def _row_count(result: Any) -> Optional[int]:
+    """Rows in a query result: list length, 1 for a single dict, 0 for None."""
+    if result is None:
+        return 0
+    if isinstance(result, dict):
+        return 1
+    if isinstance(result, (list, PlayerTable)):
+        return len(result)
+    return None
+
+def explain(statement: str) -> List[str]:
+    """EXPLAIN QUERY PLAN lines for a statement, on a separate uninstrumented connection."""
+    conn = sqlite3.connect(database.DB_PATH)
+    try:
+        rows = conn.execute(f"EXPLAIN QUERY PLAN {statement}").fetchall()
+        return [detail for _, _, _, detail in rows]
+    except sqlite3.Error as e:
+        return [f"(no plan: {e})"]
+    finally:
+        conn.close()
+
+def _explainable(statement: str) -> bool:
+    return statement.lstrip().split(None, 1)[0].upper() in ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")
+
+def _log_slow(record: QueryRecord) -> None:
+    lines = [f"{record.function} took {record.seconds * 1000:.1f} ms "
+             f"(connect {record.connect_seconds * 1000:.1f} ms, write queue {record.queue_seconds * 1000:.1f} ms, "
+             f"rows {record.rows})"]
+    explained = 0
+    for statement in dict.fromkeys(record.statements):
+        lines.append(f"  SQL: {' '.join(statement.split())}")
+        if _explainable(statement) and explained < MAX_EXPLAINED:
+            lines.extend(f"    PLAN: {detail}" for detail in explain(statement))
+            explained += 1
+    slow_query_logger.warning("\n".join(lines))
+
+def _finish(record: QueryRecord, start: float) -> None:
+    record.seconds = time.perf_counter() - start
+    slow = record.seconds * 1000 >= SLOW_QUERY_MS
+    with _stats_lock:
+        stats = _stats.setdefault(record.function, QueryStats())
+        stats.calls += 1
+        stats.errors += record.error is not None
+        stats.rows += record.rows or 0
+        stats.total_seconds += record.seconds
+        stats.max_seconds = max(stats.max_seconds, record.seconds)
+        stats.connect_seconds += record.connect_seconds
+        stats.queue_seconds += record.queue_seconds
+        stats.slow_calls += slow
+    if slow:
+        _log_slow(record)
+    for listener in list(_listeners):
+        listener(record)
+
+def _push(record: QueryRecord) -> None:
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    _local.stack.append(record)
+
+def _pop(record: QueryRecord) -> None:
+    # By identity: lazy results can finish in any order
+    stack = _local.stack
+    for i in range(len(stack) - 1, -1, -1):
+        if stack[i] is record:
+            del stack[i]
+            return
+
+def _instrumented_iterator(record: QueryRecord, iterator: Iterator[Any], start: float) -> Iterator[Any]:
+    """Time a lazy result until it is exhausted, counting the rows it yields."""
+    record.rows = 0
+    try:
+        while True:
+            # Active only while fetching, on whichever thread pulls the next row
+            _push(record)
+            try:
+                row = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                _pop(record)
+            record.rows += 1
+            yield row
+    except Exception as e:
+        record.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _finish(record, start)
+
+def wrap(function: Callable[..., Any], name: Optional[str] = None) -> Callable[..., Any]:
+    """Return an instrumented version of a query function."""
+    name = name or function.__name__
+    is_generator = inspect.isgeneratorfunction(function)
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        record = QueryRecord(function=name, started_at=time.time())
+        start = time.perf_counter()
+        _push(record)
+        try:
+            result = function(*args, **kwargs)
+        except Exception as e:
+            record.error = f"{type(e).__name__}: {e}"
+            _pop(record)
+            _finish(record, start)
+            raise
+        _pop(record)
+        if is_generator or inspect.isgenerator(result):
+            return _instrumented_iterator(record, result, start)
+        record.rows = _row_count(result)
+        record.result = result
+        _finish(record, start)
+        record.result = None
+        return result
+
+    wrapper.__instrumented__ = True
+    return wrapper
+
+def instrument(module: ModuleType) -> None:
+    """
+    Wrap every public function defined in a module (idempotent) and route
+    connections through InstrumentedConnection.
+    """
+    for attribute, member in list(vars(module).items()):
+        if (attribute.startswith('_') or not inspect.isfunction(member)
+                or member.__module__ != module.__name__ or getattr(member, '__instrumented__', False)):
+            continue
+        setattr(module, attribute, wrap(member, attribute))
+
+    database.set_connection_factory(InstrumentedConnection)
+
+    if SLOW_QUERY_LOG and not any(isinstance(handler, logging.FileHandler) for handler in slow_query_logger.handlers):
+        slow_query_logger.addHandler(logging.FileHandler(SLOW_QUERY_LOG))
+
+def uninstrument(module: ModuleType) -> None:
+    """Restore the original functions of an instrumented module."""
+    for attribute, member in list(vars(module).items()):
+        if getattr(member, '__instrumented__', False):
+            setattr(module, attribute, member.__wrapped__)
+    database.set_connection_factory(None)
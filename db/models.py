@@ -1,18 +1,37 @@
 """
 Database models and schemas for the badminton app.
 """
+from array import array
 from dataclasses import dataclass
-from typing import Optional
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
 
-@dataclass
-class User:
+# Match status values stored in matches.status
+MATCH_STATUS_ONGOING = "ongoing"
+MATCH_STATUS_COMPLETED = "completed"
+
+class _RowModel:
+    __slots__ = ()
+
+    @classmethod
+    def from_row(cls, row: Any) -> Any:
+        """
+        Build a model from a database row: a sqlite3.Row or mapping is matched
+        by column name (extra columns ignored), a plain tuple by field order.
+        """
+        if hasattr(row, 'keys'):
+            fields = cls.__dataclass_fields__
+            return cls(**{key: row[key] for key in row.keys() if key in fields})
+        return cls(*row)
+
+@dataclass(slots=True)
+class User(_RowModel):
     id: Optional[int] = None
     display_name: str = ""
     first_name: Optional[str] = None
     last_name: Optional[str] = None
 
-@dataclass
-class Match:
+@dataclass(slots=True)
+class Match(_RowModel):
     id: Optional[int] = None
     side_1_user_1_id: int = 0
     side_1_user_2_id: Optional[int] = None
@@ -25,21 +44,146 @@ class Match:
     set_3_side_1_score: Optional[int] = None
     set_3_side_2_score: Optional[int] = None
     on_court: Optional[int] = None
+    # Derived result fields, computed when a score is written
+    side_1_sets: Optional[int] = None
+    side_2_sets: Optional[int] = None
+    winner_side: Optional[int] = None
+    status: str = MATCH_STATUS_ONGOING
     # Additional fields for UI display
     side_1_user_1_display_name: Optional[str] = None
     side_1_user_2_display_name: Optional[str] = None
     side_2_user_1_display_name: Optional[str] = None
     side_2_user_2_display_name: Optional[str] = None
 
-@dataclass
-class Available:
+@dataclass(slots=True)
+class MatchOutcome:
+    side_1_sets: Optional[int] = None
+    side_2_sets: Optional[int] = None
+    winner_side: Optional[int] = None  # 1, 2, or None for a draw/no result
+    status: str = MATCH_STATUS_ONGOING
+
+    @classmethod
+    def from_scores(cls,
+                    set_1_side_1_score: Optional[int], set_1_side_2_score: Optional[int],
+                    set_2_side_1_score: Optional[int] = None, set_2_side_2_score: Optional[int] = None,
+                    set_3_side_1_score: Optional[int] = None, set_3_side_2_score: Optional[int] = None) -> "MatchOutcome":
+        """
+        Derive the result of a match from its set scores.
+        
+        A set counts when both scores are recorded and one side scored more;
+        0-0 (the unplayed default) and ties count for nobody. A match is
+        completed once the first set has been scored.
+        """
+        if set_1_side_1_score is None or set_1_side_2_score is None:
+            return cls()
+        
+        side_1_sets = 0
+        side_2_sets = 0
+        for side_1_score, side_2_score in ((set_1_side_1_score, set_1_side_2_score),
+                                           (set_2_side_1_score, set_2_side_2_score),
+                                           (set_3_side_1_score, set_3_side_2_score)):
+            if side_1_score is None or side_2_score is None:
+                continue
+            if side_1_score > side_2_score:
+                side_1_sets += 1
+            elif side_2_score > side_1_score:
+                side_2_sets += 1
+        
+        winner_side = 1 if side_1_sets > side_2_sets else 2 if side_2_sets > side_1_sets else None
+        return cls(side_1_sets, side_2_sets, winner_side, MATCH_STATUS_COMPLETED)
+
+@dataclass(slots=True)
+class Available(_RowModel):
     id: Optional[int] = None
     user_id: int = 0
 
-@dataclass
-class Elo:
+@dataclass(slots=True)
+class Elo(_RowModel):
     id: Optional[int] = None
     user_id: int = 0
     elo: float = 0
     # Additional fields for UI display
     display_name: Optional[str] = None
+
+# Lightweight tuple rows yielded by the streaming iterators in queries.
+# Field order matches the SELECT column order, so rows are built positionally.
+class UserRow(NamedTuple):
+    id: int
+    display_name: str
+    first_name: Optional[str]
+    last_name: Optional[str]
+
+class MatchRow(NamedTuple):
+    id: int
+    side_1_user_1_id: Optional[int]
+    side_1_user_2_id: Optional[int]
+    side_2_user_1_id: Optional[int]
+    side_2_user_2_id: Optional[int]
+    set_1_side_1_score: Optional[int]
+    set_1_side_2_score: Optional[int]
+    set_2_side_1_score: Optional[int]
+    set_2_side_2_score: Optional[int]
+    set_3_side_1_score: Optional[int]
+    set_3_side_2_score: Optional[int]
+    side_1_sets: Optional[int]
+    side_2_sets: Optional[int]
+    winner_side: Optional[int]
+    status: str
+    side_1_user_1_display_name: Optional[str]
+    side_1_user_2_display_name: Optional[str]
+    side_2_user_1_display_name: Optional[str]
+    side_2_user_2_display_name: Optional[str]
+    timestamp: str
+
+class EloHistoryRow(NamedTuple):
+    id: int
+    user_id: int
+    old_elo: Optional[float]
+    new_elo: float
+    change_reason: Optional[str]
+    timestamp: str
+    display_name: str
+
+class PlayerTable:
+    """
+    Columnar roster: parallel arrays of ids, ratings and names plus an
+    id-to-index map, so matching and ELO updates work on flat arrays in place.
+    """
+    __slots__ = ('ids', 'ratings', 'names', '_index')
+
+    def __init__(self, ids: Iterable[int] = (), ratings: Iterable[float] = (), names: Iterable[Optional[str]] = ()):
+        self.ids = array('q', ids)
+        self.ratings = array('d', ratings)
+        self.names: List[Optional[str]] = list(names)
+        if not len(self.ids) == len(self.ratings) == len(self.names):
+            raise ValueError("ids, ratings and names must have the same length")
+        self._index: Dict[int, int] = {user_id: i for i, user_id in enumerate(self.ids)}
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple[int, Optional[str], Optional[float]]],
+                  default_rating: float = 1500.0) -> "PlayerTable":
+        """Build a table from (user_id, display_name, elo) rows; unrated players get default_rating."""
+        ids = []
+        names = []
+        ratings = []
+        for user_id, display_name, elo in rows:
+            ids.append(user_id)
+            names.append(display_name)
+            ratings.append(default_rating if elo is None else elo)
+        return cls(ids, ratings, names)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._index
+
+    def index(self, user_id: int) -> int:
+        """Position of a player in the arrays (KeyError if absent)."""
+        return self._index[user_id]
+
+    def rating(self, user_id: int) -> float:
+        return self.ratings[self._index[user_id]]
+
+    def set_rating(self, user_id: int, rating: float) -> None:
+        self.ratings[self._index[user_id]] = rating
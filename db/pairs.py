@@ -0,0 +1,114 @@
+"""
+Pre-aggregated pair statistics (head-to-head and partnerships).
+
+Both tables store each pair in both directions, keyed by
+(player_id, other_id), so a pair lookup is a single primary-key probe and
+all pairs for one player are a single range scan.
+"""
+import sqlite3
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from .models import MATCH_STATUS_COMPLETED
+
+# Columns needed from a matches row to compute its pair contributions
+MATCH_PAIR_COLUMNS = """
+    side_1_user_1_id, side_1_user_2_id, side_2_user_1_id, side_2_user_2_id,
+    set_1_side_1_score, set_1_side_2_score,
+    set_2_side_1_score, set_2_side_2_score,
+    set_3_side_1_score, set_3_side_2_score,
+    winner_side, status
+"""
+
+# Player slots of a matches row
+PLAYER_COLUMNS = ('side_1_user_1_id', 'side_1_user_2_id', 'side_2_user_1_id', 'side_2_user_2_id')
+
+_UPSERT = """
+    INSERT INTO {table} ({other_column}, player_id, matches, wins, losses, points_for, points_against)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(player_id, {other_column}) DO UPDATE SET
+        matches = matches + excluded.matches,
+        wins = wins + excluded.wins,
+        losses = losses + excluded.losses,
+        points_for = points_for + excluded.points_for,
+        points_against = points_against + excluded.points_against
+"""
+
+def _side_points(match: Mapping[str, Any], side: int) -> int:
+    """Total points scored by one side across all recorded sets."""
+    return sum(match[f'set_{n}_side_{side}_score'] or 0 for n in (1, 2, 3))
+
+def _side_players(match: Mapping[str, Any], side: int) -> List[int]:
+    return [player_id for player_id in (match[f'side_{side}_user_1_id'], match[f'side_{side}_user_2_id'])
+            if player_id is not None]
+
+def pair_rows(match: Mapping[str, Any], sign: int = 1) -> Tuple[List[tuple], List[tuple]]:
+    """
+    Compute the partnership and head-to-head deltas for a completed match.
+
+    Args:
+        match: Row with the MATCH_PAIR_COLUMNS fields
+        sign: 1 to add the match to the aggregates, -1 to remove it
+
+    Returns:
+        Tuple of (partnership_rows, head_to_head_rows), each row being
+        (other_id, player_id, matches, wins, losses, points_for, points_against)
+    """
+    if match['status'] != MATCH_STATUS_COMPLETED:
+        return ([], [])
+
+    partnership_rows = []
+    head_to_head_rows = []
+    for side, other_side in ((1, 2), (2, 1)):
+        players = _side_players(match, side)
+        opponents = _side_players(match, other_side)
+        won = 1 if match['winner_side'] == side else 0
+        lost = 1 if match['winner_side'] == other_side else 0
+        points_for = _side_points(match, side)
+        points_against = _side_points(match, other_side)
+        delta = (sign, sign * won, sign * lost, sign * points_for, sign * points_against)
+
+        for player_id in players:
+            for partner_id in players:
+                if partner_id != player_id:
+                    partnership_rows.append((partner_id, player_id) + delta)
+            for opponent_id in opponents:
+                head_to_head_rows.append((opponent_id, player_id) + delta)
+
+    return (partnership_rows, head_to_head_rows)
+
+def apply_match(cursor: sqlite3.Cursor, match: Optional[Mapping[str, Any]], sign: int = 1) -> None:
+    """Add (sign=1) or remove (sign=-1) a match's contribution to the pair tables."""
+    if match is None:
+        return
+    partnership_rows, head_to_head_rows = pair_rows(match, sign)
+    if partnership_rows:
+        cursor.executemany(_UPSERT.format(table="partnerships", other_column="partner_id"), partnership_rows)
+    if head_to_head_rows:
+        cursor.executemany(_UPSERT.format(table="head_to_head", other_column="opponent_id"), head_to_head_rows)
+
+def fetch_match(cursor: sqlite3.Cursor, match_id: int) -> Optional[Dict[str, Any]]:
+    """
+    A match's MATCH_PAIR_COLUMNS, with players deleted since it was played
+    left out (matches keep their ids), so no pair rows are written for them.
+    """
+    cursor.execute(f"SELECT {MATCH_PAIR_COLUMNS} FROM matches WHERE id = ?", (match_id,))
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    match = dict(zip([description[0] for description in cursor.description], row))
+    player_ids = [match[column] for column in PLAYER_COLUMNS if match[column] is not None]
+    cursor.execute(f"SELECT id FROM users WHERE id IN ({', '.join(['?'] * len(player_ids))})", player_ids)
+    existing = {row[0] for row in cursor.fetchall()}
+    for column in PLAYER_COLUMNS:
+        if match[column] not in existing:
+            match[column] = None
+    return match
+
+def rebuild(cursor: sqlite3.Cursor) -> None:
+    """Recompute both pair tables from every completed match."""
+    cursor.execute("DELETE FROM partnerships")
+    cursor.execute("DELETE FROM head_to_head")
+    cursor.execute(f"SELECT {MATCH_PAIR_COLUMNS} FROM matches WHERE status = ?", (MATCH_STATUS_COMPLETED,))
+    columns = [description[0] for description in cursor.description]
+    for row in cursor.fetchall():
+        apply_match(cursor, dict(zip(columns, row)))
@@ -2,9 +2,12 @@
 Database queries for the badminton app.
 """
 import sqlite3
-from typing import List, Dict, Optional, Any, Union
+import sys
+from typing import Callable, Iterator, List, Dict, Optional, Any, Tuple, Union
+from . import instrumentation, pairs, writer
 from .database import get_connection
-from .models import User, Match, Available, Elo
+from .models import (User, Match, Available, Elo, MatchOutcome, PlayerTable, UserRow, MatchRow, EloHistoryRow,
+                     MATCH_STATUS_ONGOING, MATCH_STATUS_COMPLETED)
 
 # User queries
 def get_all_users() -> List[Dict[str, Any]]:
@@ -16,6 +19,37 @@ def get_all_users() -> List[Dict[str, Any]]:
     conn.close()
     return users
 
+# Most matches the pages ask a name search for
+SEARCH_LIMIT = 200
+
+def search_users(query: str, limit: int = 50) -> List[Dict[str, Any]]:
+    """
+    Search users by display, first or last name using the full-text index.
+    
+    Every word in the query must prefix-match a word in one of the names,
+    so "jo sm" finds "John Smith". Results are ordered by relevance and
+    include each user's Elo rating.
+    """
+    # Quote each word so punctuation is matched literally, and allow prefixes
+    terms = ['"' + word.replace('"', '""') + '"*' for word in query.split()]
+    if not terms:
+        return []
+    
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT users.*, elos.elo
+        FROM users_fts
+        JOIN users ON users.id = users_fts.rowid
+        LEFT JOIN elos ON elos.user_id = users.id
+        WHERE users_fts MATCH ?
+        ORDER BY users_fts.rank
+        LIMIT ?
+    """, (' '.join(terms), limit))
+    users = [dict(row) for row in cursor.fetchall()]
+    conn.close()
+    return users
+
 def get_user_by_id(user_id: int) -> Optional[Dict[str, Any]]:
     """Get a user by ID."""
     conn = get_connection()
@@ -25,61 +59,190 @@ def get_user_by_id(user_id: int) -> Optional[Dict[str, Any]]:
     conn.close()
     return dict(user) if user else None
 
+def _write(function: Callable[..., Any], *args: Any) -> Any:
+    """
+    Run function(cursor, *args) as a write transaction and return its result.
+    
+    Writes go through the single-writer queue (see db.writer) unless it is
+    disabled, in which case they run on a fresh connection. Either way the
+    transaction is BEGIN IMMEDIATE and nothing is kept if function raises.
+    """
+    if writer.ENABLED:
+        return writer.submit(function, *args).result()
+    conn = get_connection(pooled=False)
+    # Take the write lock up front instead of upgrading a read lock mid-transaction
+    conn.isolation_level = None
+    cursor = conn.cursor()
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        result = function(cursor, *args)
+        conn.commit()
+    finally:
+        # Closing without a commit rolls the transaction back
+        conn.close()
+    return result
+
 def create_user(user: User) -> int:
     """Create a new user and return the new user ID."""
-    conn = get_connection()
-    cursor = conn.cursor()
+    return _write(_create_user, user)
+
+def _create_user(cursor: sqlite3.Cursor, user: User) -> int:
     cursor.execute(
         "INSERT INTO users (display_name, first_name, last_name) VALUES (?, ?, ?)",
         (user.display_name, user.first_name, user.last_name)
     )
-    user_id = cursor.lastrowid
-    conn.commit()
+    return cursor.lastrowid
+
+def create_users(users: List[User], initial_elos: Optional[List[float]] = None,
+                 change_reason: Optional[str] = None) -> List[int]:
+    """
+    Create several users in a single transaction and return their IDs.
+    
+    If initial_elos is given (one rating per user), each user also gets an
+    Elo rating and a history row with change_reason.
+    """
+    if not users:
+        return []
+    return _write(_create_users, users, initial_elos, change_reason)
+
+def _create_users(cursor: sqlite3.Cursor, users: List[User], initial_elos: Optional[List[float]],
+                  change_reason: Optional[str]) -> List[int]:
+    user_ids = []
+    for user in users:
+        cursor.execute(
+            "INSERT INTO users (display_name, first_name, last_name) VALUES (?, ?, ?)",
+            (user.display_name, user.first_name, user.last_name)
+        )
+        user_ids.append(cursor.lastrowid)
+    
+    if initial_elos is not None:
+        _update_elos(cursor, [(user_id, elo, change_reason) for user_id, elo in zip(user_ids, initial_elos)])
+    
+    return user_ids
+
+def get_user_ids_by_display_name(display_names: List[str]) -> Dict[str, int]:
+    """Map display names to user IDs (the newest user wins when names repeat)."""
+    if not display_names:
+        return {}
+    
+    conn = get_connection()
+    cursor = conn.cursor()
+    placeholders = ', '.join(['?'] * len(display_names))
+    cursor.execute(f"""
+        SELECT display_name, MAX(id) AS id FROM users
+        WHERE display_name IN ({placeholders})
+        GROUP BY display_name
+    """, display_names)
+    user_ids = {row['display_name']: row['id'] for row in cursor.fetchall()}
     conn.close()
-    return user_id
+    return user_ids
 
 def update_user(user: User) -> None:
     """Update an existing user's information."""
-    if user.id is None:
+    update_users([user])
+
+def update_users(users: List[User]) -> None:
+    """Update several users' information in a single transaction."""
+    if not users:
+        return
+    _write(_update_users, users)
+
+def _update_users(cursor: sqlite3.Cursor, users: List[User]) -> None:
+    if any(user.id is None for user in users):
         raise ValueError("User ID cannot be None for update operation")
-        
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute(
+    
+    cursor.executemany(
         "UPDATE users SET display_name = ?, first_name = ?, last_name = ? WHERE id = ?",
-        (user.display_name, user.first_name, user.last_name, user.id)
+        [(user.display_name, user.first_name, user.last_name, user.id) for user in users]
     )
-    conn.commit()
+
+def count_users() -> int:
+    """Count all users."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM users")
+    count = cursor.fetchone()[0]
     conn.close()
+    return count
+
+def get_users_page(limit: int, offset: int = 0) -> List[Dict[str, Any]]:
+    """Get one page of users (ordered by display name) with their Elo ratings."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT users.id, users.display_name, users.first_name, users.last_name, elos.elo
+        FROM users
+        LEFT JOIN elos ON elos.user_id = users.id
+        ORDER BY users.display_name, users.id
+        LIMIT ? OFFSET ?
+    """, (limit, offset))
+    users = [dict(row) for row in cursor.fetchall()]
+    conn.close()
+    return users
+
+def apply_player_edits(users: List[User], elo_changes: List[Tuple[int, float, Optional[str]]]) -> int:
+    """
+    Apply edited player details and Elo ratings in a single transaction.
+    
+    Args:
+        users: Users whose name fields changed
+        elo_changes: (user_id, new_elo, change_reason) tuples; a history row
+            is written only where the rating actually changes
     
+    Returns:
+        Number of ratings changed
+    """
+    if not users and not elo_changes:
+        return 0
+    return _write(_apply_player_edits, users, elo_changes)
+
+def _apply_player_edits(cursor: sqlite3.Cursor, users: List[User],
+                        elo_changes: List[Tuple[int, float, Optional[str]]]) -> int:
+    changed = 0
+    if users:
+        _update_users(cursor, users)
+    if elo_changes:
+        changed = _update_elos(cursor, elo_changes)
+    return changed
+
 def delete_user(user_id: int) -> None:
     """Delete a user and all related data (elo, availability)."""
-    conn = get_connection()
-    cursor = conn.cursor()
+    delete_users([user_id])
+
+def delete_users(user_ids: List[int]) -> Dict[str, int]:
+    """
+    Delete several users and all related data in a single transaction.
     
-    # Check if user is involved in any matches
-    cursor.execute("""
-        SELECT COUNT(*) as match_count FROM matches 
-        WHERE side_1_user_1_id = ? OR side_1_user_2_id = ? OR 
-              side_2_user_1_id = ? OR side_2_user_2_id = ?
-    """, (user_id, user_id, user_id, user_id))
+    Matches keep their references to deleted users (ids are never reused,
+    and match queries left-join users), so scores and the singles/doubles
+    shape of past matches are preserved. Returns the number of rows deleted
+    from each table.
+    """
+    if not user_ids:
+        return {}
+    return _write(_delete_users, user_ids)
+
+def _delete_users(cursor: sqlite3.Cursor, user_ids: List[int]) -> Dict[str, int]:
+    # Join against a temp table instead of repeating a large IN list
+    cursor.execute("CREATE TEMP TABLE IF NOT EXISTS delete_ids (id INTEGER PRIMARY KEY)")
+    cursor.execute("DELETE FROM delete_ids")
+    cursor.executemany("INSERT OR IGNORE INTO delete_ids (id) VALUES (?)", [(user_id,) for user_id in user_ids])
     
-    result = cursor.fetchone()
-    if result and result['match_count'] > 0:
-        # Update matches to replace this user with NULL
-        cursor.execute("UPDATE matches SET side_1_user_1_id = NULL WHERE side_1_user_1_id = ?", (user_id,))
-        cursor.execute("UPDATE matches SET side_1_user_2_id = NULL WHERE side_1_user_2_id = ?", (user_id,))
-        cursor.execute("UPDATE matches SET side_2_user_1_id = NULL WHERE side_2_user_1_id = ?", (user_id,))
-        cursor.execute("UPDATE matches SET side_2_user_2_id = NULL WHERE side_2_user_2_id = ?", (user_id,))
-    
-    # Delete from all related tables
-    cursor.execute("DELETE FROM availables WHERE user_id = ?", (user_id,))
-    cursor.execute("DELETE FROM elos WHERE user_id = ?", (user_id,))
-    cursor.execute("DELETE FROM save WHERE user_id = ?", (user_id,))
-    cursor.execute("DELETE FROM users WHERE id = ?", (user_id,))
-    
-    conn.commit()
-    conn.close()
+    # Delete from all related tables; side_*_user_1_id is NOT NULL, so match slots are left as they are
+    counts = {}
+    for table, condition in (
+        ("availables", "user_id IN delete_ids"),
+        ("elos", "user_id IN delete_ids"),
+        ("save", "user_id IN delete_ids"),
+        ("partnerships", "player_id IN delete_ids OR partner_id IN delete_ids"),
+        ("head_to_head", "player_id IN delete_ids OR opponent_id IN delete_ids"),
+        ("users", "id IN delete_ids"),
+    ):
+        cursor.execute(f"DELETE FROM {table} WHERE {condition}")
+        counts[table] = cursor.rowcount
+    
+    cursor.execute("DROP TABLE delete_ids")
+    return counts
 
 # Available player queries
 def get_all_availables() -> List[Dict[str, Any]]:
@@ -90,7 +253,8 @@ def get_all_availables() -> List[Dict[str, Any]]:
         SELECT 
             availables.id, availables.user_id, users.display_name, 
             users.first_name, users.last_name, elos.elo,
-            CASE WHEN save.id IS NOT NULL THEN 1 ELSE 0 END as is_saved
+            CASE WHEN save.id IS NOT NULL THEN 1 ELSE 0 END as is_saved,
+            1 as is_available
         FROM availables
         JOIN users ON availables.user_id = users.id
         LEFT JOIN elos ON elos.user_id = availables.user_id
@@ -108,7 +272,8 @@ def get_all_unavailables() -> List[Dict[str, Any]]:
     cursor.execute("""
         SELECT 
             users.id as user_id, users.display_name, elos.elo,
-            CASE WHEN save.id IS NOT NULL THEN 1 ELSE 0 END as is_saved
+            CASE WHEN save.id IS NOT NULL THEN 1 ELSE 0 END as is_saved,
+            0 as is_available
         FROM users
         LEFT JOIN availables ON availables.user_id = users.id
         LEFT JOIN elos ON elos.user_id = users.id
@@ -120,11 +285,49 @@ def get_all_unavailables() -> List[Dict[str, Any]]:
     conn.close()
     return unavailables
 
-def toggle_availability(user_id: int) -> None:
-    """Toggle a player's availability status."""
+def get_availability_board() -> List[Dict[str, Any]]:
+    """Get every player with their Elo, saved flag and available flag, highest Elo first."""
     conn = get_connection()
     cursor = conn.cursor()
-    
+    cursor.execute("""
+        SELECT 
+            users.id as user_id, users.display_name, elos.elo,
+            CASE WHEN save.id IS NOT NULL THEN 1 ELSE 0 END as is_saved,
+            CASE WHEN availables.id IS NOT NULL THEN 1 ELSE 0 END as is_available
+        FROM users
+        LEFT JOIN availables ON availables.user_id = users.id
+        LEFT JOIN elos ON elos.user_id = users.id
+        LEFT JOIN save ON save.user_id = users.id
+        ORDER BY elos.elo DESC
+    """)
+    board = [dict(row) for row in cursor.fetchall()]
+    conn.close()
+    return board
+
+def get_player_availability(user_id: int) -> Optional[Dict[str, Any]]:
+    """Get a single player's availability card details."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT 
+            users.id as user_id, users.display_name, elos.elo,
+            CASE WHEN save.id IS NOT NULL THEN 1 ELSE 0 END as is_saved,
+            CASE WHEN availables.id IS NOT NULL THEN 1 ELSE 0 END as is_available
+        FROM users
+        LEFT JOIN availables ON availables.user_id = users.id
+        LEFT JOIN elos ON elos.user_id = users.id
+        LEFT JOIN save ON save.user_id = users.id
+        WHERE users.id = ?
+    """, (user_id,))
+    player = cursor.fetchone()
+    conn.close()
+    return dict(player) if player else None
+
+def toggle_availability(user_id: int) -> None:
+    """Toggle a player's availability status."""
+    _write(_toggle_availability, user_id)
+
+def _toggle_availability(cursor: sqlite3.Cursor, user_id: int) -> None:
     # Check if user is available
     cursor.execute("SELECT user_id FROM availables WHERE user_id = ?", (user_id,))
     result = cursor.fetchone()
@@ -135,70 +338,108 @@ def toggle_availability(user_id: int) -> None:
     else:
         # Add to availables if not available
         cursor.execute("INSERT INTO availables (user_id) VALUES (?)", (user_id,))
-    
-    conn.commit()
-    conn.close()
+
+def set_availability(add_ids: List[int], remove_ids: List[int]) -> None:
+    """Make players available/unavailable in a single transaction."""
+    if not add_ids and not remove_ids:
+        return
+    _write(_set_availability, add_ids, remove_ids)
+
+def _set_availability(cursor: sqlite3.Cursor, add_ids: List[int], remove_ids: List[int]) -> None:
+    cursor.executemany("INSERT OR IGNORE INTO availables (user_id) VALUES (?)",
+                       [(user_id,) for user_id in add_ids])
+    cursor.executemany("DELETE FROM availables WHERE user_id = ?",
+                       [(user_id,) for user_id in remove_ids])
 
 def save_available_state() -> None:
     """Save the current available players state."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
+    _write(_save_available_state)
+
+def _save_available_state(cursor: sqlite3.Cursor) -> None:
     # Clear current saved state
     cursor.execute("DELETE FROM save")
     
     # Save current available players
     cursor.execute("INSERT INTO save (user_id) SELECT user_id FROM availables")
-    
-    conn.commit()
-    conn.close()
 
 def load_available_state() -> None:
     """Load the saved available players state."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
+    _write(_load_available_state)
+
+def _load_available_state(cursor: sqlite3.Cursor) -> None:
     # Clear current availables
     cursor.execute("DELETE FROM availables")
     
     # Load saved availables
     cursor.execute("INSERT INTO availables (user_id) SELECT user_id FROM save")
-    
-    conn.commit()
-    conn.close()
 
 # Match queries
+MATCH_SELECT = """
+    SELECT 
+        matches.id, matches.side_1_user_1_id, matches.side_1_user_2_id,
+        matches.side_2_user_1_id, matches.side_2_user_2_id, 
+        matches.set_1_side_1_score, matches.set_1_side_2_score,
+        matches.set_2_side_1_score, matches.set_2_side_2_score,
+        matches.set_3_side_1_score, matches.set_3_side_2_score,
+        matches.side_1_sets, matches.side_2_sets,
+        matches.winner_side, matches.status,
+        u1.display_name AS side_1_user_1_display_name,
+        u2.display_name AS side_1_user_2_display_name,
+        u3.display_name AS side_2_user_1_display_name,
+        u4.display_name AS side_2_user_2_display_name,
+        matches.timestamp
+    FROM matches
+    LEFT JOIN users AS u1 ON matches.side_1_user_1_id = u1.id
+    LEFT JOIN users AS u2 ON matches.side_1_user_2_id = u2.id
+    LEFT JOIN users AS u3 ON matches.side_2_user_1_id = u3.id
+    LEFT JOIN users AS u4 ON matches.side_2_user_2_id = u4.id
+"""
+
 def get_all_matches() -> List[Dict[str, Any]]:
     """Get all matches with player details."""
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute("""
-        SELECT 
-            matches.id, matches.side_1_user_1_id, matches.side_1_user_2_id,
-            matches.side_2_user_1_id, matches.side_2_user_2_id, 
-            matches.set_1_side_1_score, matches.set_1_side_2_score,
-            matches.set_2_side_1_score, matches.set_2_side_2_score,
-            matches.set_3_side_1_score, matches.set_3_side_2_score,
-            u1.display_name AS side_1_user_1_display_name,
-            u2.display_name AS side_1_user_2_display_name,
-            u3.display_name AS side_2_user_1_display_name,
-            u4.display_name AS side_2_user_2_display_name,
-            matches.timestamp
-        FROM matches
-        LEFT JOIN users AS u1 ON matches.side_1_user_1_id = u1.id
-        LEFT JOIN users AS u2 ON matches.side_1_user_2_id = u2.id
-        LEFT JOIN users AS u3 ON matches.side_2_user_1_id = u3.id
-        LEFT JOIN users AS u4 ON matches.side_2_user_2_id = u4.id
-        ORDER BY matches.id DESC
-    """)
+    cursor.execute(MATCH_SELECT + " ORDER BY matches.id DESC")
     matches = [dict(row) for row in cursor.fetchall()]
     conn.close()
     return matches
 
-def create_match(match: Match) -> int:
-    """Create a new match and return the match ID."""
+def get_match(match_id: int) -> Optional[Dict[str, Any]]:
+    """Get a single match with player details."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(MATCH_SELECT + " WHERE matches.id = ?", (match_id,))
+    match = cursor.fetchone()
+    conn.close()
+    return dict(match) if match else None
+
+def get_matches_by_status(status: str) -> List[Dict[str, Any]]:
+    """Get matches with the given status ('ongoing' or 'completed'), newest first."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(MATCH_SELECT + " WHERE matches.status = ? ORDER BY matches.id DESC", (status,))
+    matches = [dict(row) for row in cursor.fetchall()]
+    conn.close()
+    return matches
+
+def count_matches_by_status() -> Dict[str, int]:
+    """Count matches per status, using the partial status indexes."""
     conn = get_connection()
     cursor = conn.cursor()
+    cursor.execute("""
+        SELECT
+            (SELECT COUNT(*) FROM matches WHERE status = ?) AS ongoing,
+            (SELECT COUNT(*) FROM matches WHERE status = ?) AS completed
+    """, (MATCH_STATUS_ONGOING, MATCH_STATUS_COMPLETED))
+    row = cursor.fetchone()
+    conn.close()
+    return {MATCH_STATUS_ONGOING: row['ongoing'], MATCH_STATUS_COMPLETED: row['completed']}
+
+def create_match(match: Match) -> int:
+    """Create a new match and return the match ID."""
+    return _write(_create_match, match)
+
+def _create_match(cursor: sqlite3.Cursor, match: Match) -> int:
     cursor.execute(
         """
         INSERT INTO matches (
@@ -211,35 +452,77 @@ def create_match(match: Match) -> int:
             match.side_2_user_1_id, match.side_2_user_2_id
         )
     )
-    match_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
-    return match_id
+    return cursor.lastrowid
+
+class PlayersUnavailableError(Exception):
+    """Raised when players picked for a match have left the available pool."""
+
+def claim_and_create_match(match: Match) -> int:
+    """
+    Take a match's players out of the available pool and create the match,
+    in one transaction, and return the match ID.
+    
+    Raises PlayersUnavailableError, leaving the database unchanged, if any
+    player is no longer available (e.g. another session just put them in a
+    match), so the caller can pick teams again from a fresh pool.
+    """
+    return _write(_claim_and_create_match, match)
+
+def _claim_and_create_match(cursor: sqlite3.Cursor, match: Match) -> int:
+    player_ids = list({player_id for player_id in (match.side_1_user_1_id, match.side_1_user_2_id,
+                                                   match.side_2_user_1_id, match.side_2_user_2_id)
+                       if player_id is not None})
+    placeholders = ', '.join(['?'] * len(player_ids))
+    cursor.execute(f"DELETE FROM availables WHERE user_id IN ({placeholders})", player_ids)
+    
+    # Every player must have been claimed by this transaction
+    if cursor.rowcount != len(player_ids):
+        raise PlayersUnavailableError(
+            f"{len(player_ids) - cursor.rowcount} of {len(player_ids)} players are no longer available"
+        )
+    return _create_match(cursor, match)
 
 def update_match_score(match_id: int, 
                       set_1_side_1_score: int, set_1_side_2_score: int,
                       set_2_side_1_score: Optional[int] = None, set_2_side_2_score: Optional[int] = None,
-                      set_3_side_1_score: Optional[int] = None, set_3_side_2_score: Optional[int] = None) -> None:
-    """Update a match's score."""
-    conn = get_connection()
-    cursor = conn.cursor()
+                      set_3_side_1_score: Optional[int] = None, set_3_side_2_score: Optional[int] = None) -> MatchOutcome:
+    """Update a match's score along with its derived result, and return the result."""
+    outcome = MatchOutcome.from_scores(
+        set_1_side_1_score, set_1_side_2_score,
+        set_2_side_1_score, set_2_side_2_score,
+        set_3_side_1_score, set_3_side_2_score
+    )
+    scores = (
+        set_1_side_1_score, set_1_side_2_score,
+        set_2_side_1_score, set_2_side_2_score,
+        set_3_side_1_score, set_3_side_2_score
+    )
+    _write(_update_match_score, match_id, scores, outcome)
+    return outcome
+
+def _update_match_score(cursor: sqlite3.Cursor, match_id: int, scores: Tuple[Optional[int], ...],
+                        outcome: MatchOutcome) -> None:
+    # Take the previous result out of the pair aggregates before rewriting it
+    pairs.apply_match(cursor, pairs.fetch_match(cursor, match_id), sign=-1)
+    
     cursor.execute(
         """
         UPDATE matches 
         SET set_1_side_1_score = ?, set_1_side_2_score = ?,
             set_2_side_1_score = ?, set_2_side_2_score = ?,
-            set_3_side_1_score = ?, set_3_side_2_score = ?
+            set_3_side_1_score = ?, set_3_side_2_score = ?,
+            side_1_sets = ?, side_2_sets = ?, winner_side = ?, status = ?
         WHERE id = ?
         """,
         (
-            set_1_side_1_score, set_1_side_2_score,
-            set_2_side_1_score, set_2_side_2_score,
-            set_3_side_1_score, set_3_side_2_score,
+            *scores,
+            outcome.side_1_sets, outcome.side_2_sets,
+            outcome.winner_side, outcome.status,
             match_id
         )
     )
-    conn.commit()
-    conn.close()
+    
+    pairs.apply_match(cursor, pairs.fetch_match(cursor, match_id))
 
 def get_match_players(match_id: int) -> List[int]:
     """Get all player IDs participating in a match."""
@@ -285,9 +568,9 @@ def get_all_elos() -> List[Dict[str, Any]]:
 
 def update_elo(user_id: int, new_elo: float, change_reason: Optional[str] = None) -> None:
     """Update a player's Elo rating or create it if it doesn't exist."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
+    _write(_update_elo, user_id, new_elo, change_reason)
+
+def _update_elo(cursor: sqlite3.Cursor, user_id: int, new_elo: float, change_reason: Optional[str]) -> None:
     # Check if Elo exists for this user
     cursor.execute("SELECT id, elo FROM elos WHERE user_id = ?", (user_id,))
     elo_record = cursor.fetchone()
@@ -314,9 +597,49 @@ def update_elo(user_id: int, new_elo: float, change_reason: Optional[str] = None
         "INSERT INTO elo_history (user_id, old_elo, new_elo, change_reason) VALUES (?, ?, ?, ?)",
         (user_id, old_elo, new_elo, change_reason)
     )
+
+def update_elos(elo_changes: List[Tuple[int, float, Optional[str]]]) -> int:
+    """
+    Update several players' Elo ratings in a single transaction.
     
-    conn.commit()
-    conn.close()
+    Takes (user_id, new_elo, change_reason) tuples. Ratings that already have
+    the requested value are skipped. Returns the number of ratings changed.
+    """
+    if not elo_changes:
+        return 0
+    return _write(_update_elos, elo_changes)
+
+def _update_elos(cursor: sqlite3.Cursor, elo_changes: List[Tuple[int, float, Optional[str]]]) -> int:
+    # Read the current ratings for all affected users in one query
+    user_ids = list({user_id for user_id, _, _ in elo_changes})
+    placeholders = ', '.join(['?'] * len(user_ids))
+    cursor.execute(f"SELECT user_id, elo FROM elos WHERE user_id IN ({placeholders})", user_ids)
+    current = {row['user_id']: row['elo'] for row in cursor.fetchall()}
+    existing = set(current)
+    
+    # Final rating per user; history keeps every step that changed something
+    updates = {}
+    inserts = {}
+    history = []
+    for user_id, new_elo, change_reason in elo_changes:
+        old_elo = current.get(user_id)
+        if old_elo is not None and old_elo == new_elo:
+            continue
+        if user_id in existing:
+            updates[user_id] = new_elo
+        else:
+            inserts[user_id] = new_elo
+        history.append((user_id, old_elo, new_elo, change_reason))
+        current[user_id] = new_elo
+    
+    cursor.executemany("UPDATE elos SET elo = ? WHERE user_id = ?",
+                       [(elo, user_id) for user_id, elo in updates.items()])
+    cursor.executemany("INSERT INTO elos (user_id, elo) VALUES (?, ?)", list(inserts.items()))
+    cursor.executemany(
+        "INSERT INTO elo_history (user_id, old_elo, new_elo, change_reason) VALUES (?, ?, ?, ?)",
+        history
+    )
+    return len(history)
 
 def get_available_players(min_rank: Optional[int] = None, max_rank: Optional[int] = None) -> List[Dict[str, Any]]:
     """Get available players, optionally filtered by rank range."""
@@ -352,29 +675,59 @@ def get_available_players(min_rank: Optional[int] = None, max_rank: Optional[int
     
     return players
 
+def get_available_player_table() -> PlayerTable:
+    """Get available players as a columnar PlayerTable, highest ELO first."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    cursor.execute("""
+        SELECT availables.user_id, users.display_name, elos.elo 
+        FROM availables 
+        JOIN users ON availables.user_id = users.id
+        LEFT JOIN elos ON availables.user_id = elos.user_id 
+        ORDER BY elos.elo DESC
+    """)
+    table = PlayerTable.from_rows(cursor.fetchall())
+    conn.close()
+    return table
+
+def get_player_table(user_ids: List[int]) -> PlayerTable:
+    """Get the given players (unrated players at 1500) as a PlayerTable."""
+    if not user_ids:
+        return PlayerTable()
+    
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    placeholders = ', '.join(['?'] * len(user_ids))
+    cursor.execute(f"""
+        SELECT users.id, users.display_name, elos.elo
+        FROM users
+        LEFT JOIN elos ON elos.user_id = users.id
+        WHERE users.id IN ({placeholders})
+    """, list(user_ids))
+    table = PlayerTable.from_rows(cursor.fetchall())
+    conn.close()
+    return table
+
 def remove_players_from_available(player_ids: List[int]) -> None:
     """Remove multiple players from the available list."""
     if not player_ids:
         return
-        
-    conn = get_connection()
-    cursor = conn.cursor()
-    
+    _write(_remove_players_from_available, player_ids)
+
+def _remove_players_from_available(cursor: sqlite3.Cursor, player_ids: List[int]) -> None:
     # Using parameter substitution for a list of IDs
     placeholders = ', '.join(['?'] * len(player_ids))
     cursor.execute(f"DELETE FROM availables WHERE user_id IN ({placeholders})", player_ids)
-    
-    conn.commit()
-    conn.close()
 
 def add_players_to_available(player_ids: List[int]) -> None:
     """Add multiple players to the available list."""
     if not player_ids:
         return
-        
-    conn = get_connection()
-    cursor = conn.cursor()
-    
+    _write(_add_players_to_available, player_ids)
+
+def _add_players_to_available(cursor: sqlite3.Cursor, player_ids: List[int]) -> None:
     for player_id in player_ids:
         try:
             cursor.execute("INSERT INTO availables (user_id) VALUES (?)", (player_id,))
@@ -382,23 +735,226 @@ def add_players_to_available(player_ids: List[int]) -> None:
             # Ignore if player is already in the available list
             pass
     
-    conn.commit()
-    conn.close()
-    
 
-def get_player_elo_history(user_id: int) -> List[Dict[str, Any]]:
-    """Get the ELO rating history for a player."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
+def get_player_elo_history(user_id: int, start: Optional[str] = None, end: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Get the ELO rating history for a player, optionally limited to a time range."""
+    return get_players_elo_history([user_id], start, end)
+
+def _elo_history_query(user_ids: Optional[List[int]], start: Optional[str], end: Optional[str]) -> Tuple[str, List[Any]]:
+    """Build the ELO history SELECT (newest first) for the given filters."""
+    conditions = []
+    params: List[Any] = []
+    if user_ids is not None:
+        placeholders = ', '.join(['?'] * len(user_ids))
+        conditions.append(f"elo_history.user_id IN ({placeholders})")
+        params.extend(user_ids)
+    if start is not None:
+        conditions.append("elo_history.timestamp >= ?")
+        params.append(start)
+    if end is not None:
+        conditions.append("elo_history.timestamp <= ?")
+        params.append(end)
+    
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    return f"""
         SELECT elo_history.id, elo_history.user_id, elo_history.old_elo, 
                elo_history.new_elo, elo_history.change_reason, elo_history.timestamp,
                users.display_name
         FROM elo_history
         JOIN users ON elo_history.user_id = users.id
-        WHERE elo_history.user_id = ?
+        {where}
         ORDER BY elo_history.timestamp DESC
-    """, (user_id,))
+    """, params
+
+def get_players_elo_history(user_ids: List[int], start: Optional[str] = None, end: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Get the ELO rating history for several players, newest first.
+    
+    start and end are inclusive timestamps ('YYYY-MM-DD' or 'YYYY-MM-DD HH:MM:SS').
+    """
+    if not user_ids:
+        return []
+    
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(*_elo_history_query(user_ids, start, end))
     history = [dict(row) for row in cursor.fetchall()]
     conn.close()
     return history
+
+# Pair statistics queries
+_PAIR_RATES = """
+    matches, wins, losses, points_for, points_against,
+    CAST(wins AS REAL) / matches AS win_rate,
+    CAST(points_for - points_against AS REAL) / matches AS avg_point_diff
+"""
+
+def get_head_to_head(player_id: int, opponent_id: int) -> Optional[Dict[str, Any]]:
+    """Get player's record against an opponent, or None if they have never met."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT player_id, opponent_id, {_PAIR_RATES}
+        FROM head_to_head
+        WHERE player_id = ? AND opponent_id = ? AND matches > 0
+    """, (player_id, opponent_id))
+    record = cursor.fetchone()
+    conn.close()
+    return dict(record) if record else None
+
+def get_partnership(player_id: int, partner_id: int) -> Optional[Dict[str, Any]]:
+    """Get player's record when teamed with a partner, or None if they have never partnered."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT player_id, partner_id, {_PAIR_RATES}
+        FROM partnerships
+        WHERE player_id = ? AND partner_id = ? AND matches > 0
+    """, (player_id, partner_id))
+    record = cursor.fetchone()
+    conn.close()
+    return dict(record) if record else None
+
+def get_best_partners(player_id: int, limit: int = 5, min_matches: int = 1) -> List[Dict[str, Any]]:
+    """Get a player's partners ranked by win rate, then by average point differential."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT partnerships.partner_id, users.display_name, {_PAIR_RATES}
+        FROM partnerships
+        JOIN users ON partnerships.partner_id = users.id
+        WHERE partnerships.player_id = ? AND matches >= MAX(?, 1)
+        ORDER BY win_rate DESC, avg_point_diff DESC
+        LIMIT ?
+    """, (player_id, min_matches, limit))
+    partners = [dict(row) for row in cursor.fetchall()]
+    conn.close()
+    return partners
+
+# Streaming queries
+STREAM_BATCH_SIZE = 1000
+EXPORT_BATCH_SIZE = 5000
+
+def _fetch_batches(cursor: sqlite3.Cursor, batch_size: int) -> Iterator[list]:
+    """Yield the remaining rows of an executed cursor in fetchmany batches."""
+    while True:
+        batch = cursor.fetchmany(batch_size)
+        if not batch:
+            break
+        yield batch
+
+def _iter_rows(sql: str, params: Union[tuple, list], row_type: Any, batch_size: int) -> Iterator[Any]:
+    """
+    Lazily yield query rows as row_type tuples, fetched in batches.
+    
+    The connection opens on the first next() and closes when the iterator
+    is exhausted or closed.
+    """
+    conn = get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        cursor.execute(sql, params)
+        make = row_type._make
+        for batch in _fetch_batches(cursor, batch_size):
+            yield from map(make, batch)
+    finally:
+        conn.close()
+
+def iter_users(batch_size: int = STREAM_BATCH_SIZE) -> Iterator[UserRow]:
+    """Stream all users ordered by display name."""
+    return _iter_rows(
+        "SELECT id, display_name, first_name, last_name FROM users ORDER BY display_name",
+        (), UserRow, batch_size
+    )
+
+def iter_matches(status: Optional[str] = None, batch_size: int = STREAM_BATCH_SIZE) -> Iterator[MatchRow]:
+    """Stream matches with player names, newest first, optionally by status."""
+    if status is None:
+        return _iter_rows(MATCH_SELECT + " ORDER BY matches.id DESC", (), MatchRow, batch_size)
+    return _iter_rows(MATCH_SELECT + " WHERE matches.status = ? ORDER BY matches.id DESC",
+                      (status,), MatchRow, batch_size)
+
+def iter_elo_history(user_ids: Optional[List[int]] = None, start: Optional[str] = None,
+                     end: Optional[str] = None, batch_size: int = STREAM_BATCH_SIZE) -> Iterator[EloHistoryRow]:
+    """
+    Stream ELO history rows, newest first.
+    
+    user_ids limits the rows to those players (all players when None);
+    start and end are inclusive timestamps as in get_players_elo_history.
+    """
+    if user_ids is not None and not user_ids:
+        return iter(())
+    sql, params = _elo_history_query(user_ids, start, end)
+    return _iter_rows(sql, params, EloHistoryRow, batch_size)
+
+def _stream_query(sql: str, params: tuple = (), batch_size: int = EXPORT_BATCH_SIZE) -> Tuple[List[str], Iterator[tuple]]:
+    """
+    Run a query and return its column names plus a lazy iterator over plain
+    tuple rows, fetched in batches. The connection closes when the iterator
+    is exhausted or closed.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    try:
+        cursor.execute(sql, params)
+    except Exception:
+        conn.close()
+        raise
+    columns = [description[0] for description in cursor.description]
+    
+    def rows() -> Iterator[tuple]:
+        try:
+            for batch in _fetch_batches(cursor, batch_size):
+                yield from batch
+        finally:
+            conn.close()
+    
+    return columns, rows()
+
+def export_matches() -> Tuple[List[str], Iterator[tuple]]:
+    """Stream all matches with resolved player names, oldest first."""
+    return _stream_query("""
+        SELECT 
+            matches.id, matches.timestamp, matches.status,
+            matches.side_1_user_1_id, u1.display_name AS side_1_user_1_name,
+            matches.side_1_user_2_id, u2.display_name AS side_1_user_2_name,
+            matches.side_2_user_1_id, u3.display_name AS side_2_user_1_name,
+            matches.side_2_user_2_id, u4.display_name AS side_2_user_2_name,
+            matches.set_1_side_1_score, matches.set_1_side_2_score,
+            matches.set_2_side_1_score, matches.set_2_side_2_score,
+            matches.set_3_side_1_score, matches.set_3_side_2_score,
+            matches.side_1_sets, matches.side_2_sets, matches.winner_side
+        FROM matches
+        LEFT JOIN users AS u1 ON matches.side_1_user_1_id = u1.id
+        LEFT JOIN users AS u2 ON matches.side_1_user_2_id = u2.id
+        LEFT JOIN users AS u3 ON matches.side_2_user_1_id = u3.id
+        LEFT JOIN users AS u4 ON matches.side_2_user_2_id = u4.id
+        ORDER BY matches.id
+    """)
+
+def export_elo_history() -> Tuple[List[str], Iterator[tuple]]:
+    """Stream the full ELO history with player names, oldest first."""
+    return _stream_query("""
+        SELECT elo_history.id, elo_history.timestamp, elo_history.user_id,
+               users.display_name, elo_history.old_elo, elo_history.new_elo,
+               elo_history.change_reason
+        FROM elo_history
+        LEFT JOIN users ON elo_history.user_id = users.id
+        ORDER BY elo_history.id
+    """)
+
+def export_ratings() -> Tuple[List[str], Iterator[tuple]]:
+    """Stream every player's current rating (NULL for unrated players)."""
+    return _stream_query("""
+        SELECT users.id AS user_id, users.display_name, users.first_name,
+               users.last_name, elos.elo
+        FROM users
+        LEFT JOIN elos ON elos.user_id = users.id
+        ORDER BY users.id
+    """)
+
+# Per-function timing and slow-query log, off unless BADMINTON_DB_INSTRUMENT is set
+if instrumentation.ENABLED:
+    instrumentation.instrument(sys.modules[__name__])
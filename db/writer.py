@@ -0,0 +1,228 @@
+"""
+Single-writer queue for database writes.
+
+All write queries in db.queries go through one writer thread that owns the
+process's only write connection, so Streamlit sessions no longer compete
+for SQLite's write lock. Requests that queue up while a transaction is
+being committed are grouped into the next one (group commit): the writer
+opens a BEGIN IMMEDIATE transaction, runs each request inside its own
+savepoint so a failing request is rolled back without affecting the others,
+commits once and then resolves every request's future.
+
+The queue removes contention between writers only: the database is not in
+WAL mode, so while the writer commits, SQLite's rollback journal still
+holds an exclusive lock and readers on other connections can get
+"database is locked" (or wait out their busy timeout) until it finishes.
+
+A failure that escapes a batch fails that batch's futures and the thread
+keeps serving; if the thread dies anyway, get_writer() replaces it and
+fails whatever was still queued, so callers never wait forever.
+
+When db.queries is instrumented, each request carries the caller's query
+record, so the SQL it runs and the time it waited in the queue are
+charged to the query function that submitted it.
+
+Environment:
+    BADMINTON_WRITE_QUEUE   0/false/no to write on a fresh connection per call instead
+"""
+import atexit
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional, Tuple
+
+from . import database, instrumentation
+from .instrumentation import QueryRecord
+
+ENABLED = os.environ.get("BADMINTON_WRITE_QUEUE", "1").lower() not in ("0", "false", "no")
+
+# Most requests committed in one transaction
+MAX_BATCH = 64
+
+logger = logging.getLogger(__name__)
+
+@dataclass(slots=True)
+class WriteRequest:
+    function: Callable[..., Any]
+    args: Tuple[Any, ...]
+    future: Future
+    record: Optional[QueryRecord] = None  # caller's instrumented call, if any
+    queued_at: float = 0.0
+
+class Writer:
+    """Writer thread with its own connection, fed through a queue."""
+
+    def __init__(self):
+        # The connection is opened by the thread, for the database current at creation
+        self.path = database.DB_PATH
+        self.factory = database._connection_factory
+        self.requests: "queue.SimpleQueue[Optional[WriteRequest]]" = queue.SimpleQueue()
+        self.batches = 0
+        self.committed = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._cursor: Optional[sqlite3.Cursor] = None
+        self.thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self.thread.start()
+
+    def submit(self, function: Callable[..., Any], *args: Any) -> Future:
+        """Queue function(cursor, *args) to run in a write transaction."""
+        future: Future = Future()
+        if threading.current_thread() is self.thread:
+            # A request that submits another write joins its transaction
+            future.set_running_or_notify_cancel()
+            try:
+                future.set_result(function(self._cursor, *args))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        self.requests.put(WriteRequest(function, args, future, instrumentation.current(), time.perf_counter()))
+        return future
+
+    def close(self) -> None:
+        """Finish the queued requests and stop the thread."""
+        self.requests.put(None)
+        self.thread.join()
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            request = self.requests.get()
+            if request is None:
+                break
+            batch = [request]
+            while len(batch) < MAX_BATCH:
+                try:
+                    request = self.requests.get_nowait()
+                except queue.Empty:
+                    break
+                if request is None:
+                    stopping = True
+                    break
+                batch.append(request)
+            try:
+                self._commit(batch)
+            except BaseException as e:
+                # Keep the thread alive: fail what is unresolved and start over on a fresh connection
+                logger.exception("Database writer batch failed")
+                self._reset()
+                self._fail(batch, e)
+        if self._conn is not None:
+            self._conn.close()
+
+    def abandon(self) -> None:
+        """Fail every request still queued on a writer whose thread has died."""
+        pending = []
+        while True:
+            try:
+                request = self.requests.get_nowait()
+            except queue.Empty:
+                break
+            if request is not None:
+                pending.append(request)
+        self._fail(pending, RuntimeError("Database writer thread stopped"))
+
+    @staticmethod
+    def _fail(batch: List[WriteRequest], error: BaseException) -> None:
+        for request in batch:
+            if request.future.done():
+                continue
+            try:
+                if request.future.running() or request.future.set_running_or_notify_cancel():
+                    request.future.set_exception(error)
+            except Exception:
+                # Resolved or cancelled concurrently
+                pass
+
+    def _reset(self) -> None:
+        """Drop the connection after an unexpected failure; it is reopened for the next batch."""
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+        self._conn = None
+        self._cursor = None
+
+    def _open(self) -> None:
+        conn = sqlite3.connect(self.path, check_same_thread=False, factory=self.factory)
+        conn.row_factory = sqlite3.Row
+        # Transactions are managed explicitly below
+        conn.isolation_level = None
+        self._conn = conn
+        self._cursor = conn.cursor()
+
+    def _commit(self, batch: List[WriteRequest]) -> None:
+        batch = [request for request in batch if request.future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        outcomes = []
+        try:
+            # Opening the connection and taking the write lock count against the first request
+            with instrumentation.attach(batch[0].record):
+                if self._conn is None:
+                    self._open()
+                cursor = self._cursor
+                cursor.execute("BEGIN IMMEDIATE")
+            for request in batch:
+                if request.record is not None:
+                    request.record.queue_seconds += time.perf_counter() - request.queued_at
+                cursor.execute("SAVEPOINT write_request")
+                try:
+                    with instrumentation.attach(request.record):
+                        outcomes.append((True, request.function(cursor, *request.args)))
+                except BaseException as e:
+                    cursor.execute("ROLLBACK TO write_request")
+                    outcomes.append((False, e))
+                cursor.execute("RELEASE write_request")
+            self._conn.commit()
+        except Exception as e:
+            # The transaction as a whole failed (locked database, I/O error, ...)
+            if self._conn is not None and self._conn.in_transaction:
+                self._conn.rollback()
+            for request in batch:
+                request.future.set_exception(e)
+            return
+        self.batches += 1
+        self.committed += len(batch)
+        for request, (ok, value) in zip(batch, outcomes):
+            if ok:
+                request.future.set_result(value)
+            else:
+                request.future.set_exception(value)
+
+_writer: Optional[Writer] = None
+_writer_lock = threading.Lock()
+
+def get_writer() -> Writer:
+    """The process's writer, restarted if the database path or connection factory changed."""
+    global _writer
+    with _writer_lock:
+        if _writer is not None and not _writer.thread.is_alive():
+            _writer.abandon()
+            _writer = None
+        if _writer is not None and (_writer.path != database.DB_PATH
+                                    or _writer.factory is not database._connection_factory):
+            _writer.close()
+            _writer = None
+        if _writer is None:
+            _writer = Writer()
+        return _writer
+
+def submit(function: Callable[..., Any], *args: Any) -> Future:
+    """Queue function(cursor, *args) on the writer and return its future."""
+    return get_writer().submit(function, *args)
+
+def shutdown() -> None:
+    """Commit whatever is queued and stop the writer thread."""
+    global _writer
+    with _writer_lock:
+        if _writer is not None:
+            _writer.close()
+            _writer = None
+
+atexit.register(shutdown)
@@ -5,6 +5,8 @@ import streamlit as st
 from typing import List, Dict, Any
 
 from db import queries
+from db.database import get_data_version
+from utils import metrics, profiling
 
 def render_available_players():
     """Render the available players management page."""
@@ -29,14 +31,44 @@ def render_available_players():
     # Add search filter
     search_term = st.text_input("Search Players", "")
     
-    # Fetch all players
-    available_players = queries.get_all_availables()
-    unavailable_players = queries.get_all_unavailables()
+    # One cached snapshot of the board, refreshed whenever the database changes
+    with profiling.stage("fetch availability board"):
+        metrics.inc('badminton_cache_requests_total', cache='availability_board')
+        board = _load_board(get_data_version())
     
-    # Filter players based on search term
-    if search_term:
-        available_players = [p for p in available_players if search_term.lower() in p['display_name'].lower()]
-        unavailable_players = [p for p in unavailable_players if search_term.lower() in p['display_name'].lower()]
+    # Narrow to players matching the indexed name search, if any
+    if search_term.strip():
+        with profiling.stage("search players"):
+            # One extra row tells whether the search was cut off
+            results = queries.search_users(search_term, limit=queries.SEARCH_LIMIT + 1)
+        if len(results) > queries.SEARCH_LIMIT:
+            st.info(f"Showing the first {queries.SEARCH_LIMIT} matches, refine your search to see the rest.")
+        matching_ids = {user['id'] for user in results[:queries.SEARCH_LIMIT]}
+        board = [player for player in board if player['user_id'] in matching_ids]
+    
+    # Split into available/unavailable
+    available_players = [player for player in board if player['is_available']]
+    unavailable_players = [player for player in board if not player['is_available']]
+    
+    # Batch mode: pick the whole night's roster and apply it in one transaction
+    with st.expander("Batch Edit Availability"):
+        with st.form("batch_availability_form"):
+            all_players = {p['user_id']: p['display_name'] for p in available_players + unavailable_players}
+            current_ids = {p['user_id'] for p in available_players}
+            selected_ids = st.multiselect(
+                "Available players",
+                options=list(all_players),
+                default=[user_id for user_id in all_players if user_id in current_ids],
+                format_func=lambda x: all_players[x]
+            )
+            if st.form_submit_button("Apply", type="primary", use_container_width=True):
+                selected = set(selected_ids)
+                # Only players shown in the form are touched, so an active search leaves others alone
+                queries.set_availability(
+                    add_ids=sorted(selected - current_ids),
+                    remove_ids=sorted(current_ids - selected)
+                )
+                st.rerun()
     
     # Create two columns for available and unavailable players
     col1, col2 = st.columns(2)
@@ -49,39 +81,7 @@ def render_available_players():
         
         # Display available players
         for player in available_players:
-            player_name = player['display_name']
-            elo = player.get('elo', 'N/A')
-            is_saved = player.get('is_saved', 0) == 1
-            
-            # Create a container for each player
-            player_container = st.container()
-            
-            # Apply styling based on saved status
-            if is_saved:
-                bgcolor = "#89f0e5"
-            else:
-                bgcolor = "#f0f0f0"
-            
-            # Create a horizontal layout for each player
-            cols = player_container.columns([5, 1])
-            
-            # Display player info with custom styling and class for mobile targeting
-            cols[0].markdown(
-                f"""
-                <div class="player-card" style="background-color: {bgcolor}; padding: 12px; border-radius: 10px; margin: 8px 0; display: flex; align-items: center;">
-                    <div style="flex-grow: 1;">
-                        <span style="font-weight: bold; font-size: 16px;">{player_name}</span><br>
-                        <span style="font-size: 14px; color: #555;">ELO: {elo}</span>
-                    </div>
-                </div>
-                """, 
-                unsafe_allow_html=True
-            )
-            
-            # Add button to move player to unavailable with more mobile-friendly icon
-            if cols[1].button("🔄", key=f"make_unavailable_{player['user_id']}", help="Move to unavailable"):
-                queries.toggle_availability(player['user_id'])
-                st.rerun()
+            _render_player_card(player)
     
     with col2:
         st.subheader("Unavailable Players")
@@ -91,36 +91,77 @@ def render_available_players():
         
         # Display unavailable players
         for player in unavailable_players:
-            player_name = player['display_name']
-            elo = player.get('elo', 'N/A')
-            is_saved = player.get('is_saved', 0) == 1
-            
-            # Create a container for each player
-            player_container = st.container()
-            
-            # Apply styling based on saved status
-            if is_saved:
-                bgcolor = "#89f0e5"
-            else:
-                bgcolor = "#f0f0f0"
-            
-            # Create a horizontal layout for each player
-            cols = player_container.columns([1, 5])
-            
-            # Add button to move player to available with more mobile-friendly icon
-            if cols[0].button("✅", key=f"make_available_{player['user_id']}", help="Make available"):
-                queries.toggle_availability(player['user_id'])
-                st.rerun()
-            
-            # Display player info with custom styling and class for mobile targeting
-            cols[1].markdown(
-                f"""
-                <div class="player-card" style="background-color: {bgcolor}; padding: 12px; border-radius: 10px; margin: 8px 0; display: flex; align-items: center;">
-                    <div style="flex-grow: 1;">
-                        <span style="font-weight: bold; font-size: 16px;">{player_name}</span><br>
-                        <span style="font-size: 14px; color: #555;">ELO: {elo}</span>
-                    </div>
-                </div>
-                """, 
-                unsafe_allow_html=True
-            )
+            _render_player_card(player)
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def _load_board(data_version: int) -> List[Dict[str, Any]]:
+    """Load the availability board for a given data version."""
+    # Only runs on a cache miss
+    metrics.inc('badminton_cache_misses_total', cache='availability_board')
+    return queries.get_availability_board()
+
+def _request_toggle(user_id: int) -> None:
+    """Mark a player's availability to be toggled by their card's fragment rerun."""
+    st.session_state[f"toggle_player_{user_id}"] = True
+
+@st.fragment
+@profiling.fragment("player card")
+def _render_player_card(player: Dict[str, Any]):
+    """
+    Render one player's card and availability button.
+    
+    Clicking the button only reruns this fragment, which toggles the player
+    and re-renders the card from their own row; the lists are re-sorted on
+    the next full rerun. The toggle runs here rather than in the button
+    callback so it is part of the fragment's trace.
+    """
+    if st.session_state.pop(f"toggle_player_{player['user_id']}", False):
+        with profiling.stage("toggle availability"):
+            queries.toggle_availability(player['user_id'])
+            player = queries.get_player_availability(player['user_id'])
+    if player is None:
+        return
+    
+    player_name = player['display_name']
+    elo = player.get('elo', 'N/A')
+    is_saved = player.get('is_saved', 0) == 1
+    is_available = player.get('is_available', 0) == 1
+    
+    # Create a container for each player
+    player_container = st.container()
+    
+    # Apply styling based on saved status
+    if is_saved:
+        bgcolor = "#89f0e5"
+    else:
+        bgcolor = "#f0f0f0"
+    
+    card_html = f"""
+        <div class="player-card" style="background-color: {bgcolor}; padding: 12px; border-radius: 10px; margin: 8px 0; display: flex; align-items: center;">
+            <div style="flex-grow: 1;">
+                <span style="font-weight: bold; font-size: 16px;">{player_name}</span><br>
+                <span style="font-size: 14px; color: #555;">ELO: {elo}</span>
+            </div>
+        </div>
+        """
+    
+    if is_available:
+        # Create a horizontal layout for each player
+        cols = player_container.columns([5, 1])
+        
+        # Display player info with custom styling and class for mobile targeting
+        cols[0].markdown(card_html, unsafe_allow_html=True)
+        
+        # Add button to move player to unavailable with more mobile-friendly icon
+        cols[1].button("🔄", key=f"make_unavailable_{player['user_id']}", help="Move to unavailable",
+                       on_click=_request_toggle, args=(player['user_id'],))
+    else:
+        # Create a horizontal layout for each player
+        cols = player_container.columns([1, 5])
+        
+        # Add button to move player to available with more mobile-friendly icon
+        cols[0].button("✅", key=f"make_available_{player['user_id']}", help="Make available",
+                       on_click=_request_toggle, args=(player['user_id'],))
+        
+        # Display player info with custom styling and class for mobile targeting
+        cols[1].markdown(card_html, unsafe_allow_html=True)
@@ -7,6 +7,11 @@ from typing import List, Dict, Any
 
 from db import queries
 from db.models import User
+from utils import profiling
+from utils.csv_import import import_players
+
+# Number of players shown per page in the view list and edit grid
+EDIT_PAGE_SIZE = 25
 
 def render_players():
     """Render the player management page."""
@@ -83,79 +88,66 @@ Mike Johnson,Mike,Johnson,1450"""
         
         if uploaded_file is not None:
             try:
-                # Read CSV file
-                df = pd.read_csv(uploaded_file)
-                
-                # Display preview
+                # Preview only the first rows; the import itself streams the file
                 st.write("Preview:")
-                st.dataframe(df.head())
+                st.dataframe(pd.read_csv(uploaded_file, nrows=5))
+                uploaded_file.seek(0)
                 
                 if st.button("Import Players", type="primary"):
-                    success_count = 0
-                    error_count = 0
+                    progress_bar = st.progress(0.0, text="Importing players...")
+                    result = import_players(
+                        uploaded_file,
+                        progress=lambda fraction, r: progress_bar.progress(fraction, text=f"Imported {r.imported} players...")
+                    )
+                    progress_bar.progress(1.0, text="Import finished")
                     
-                    # Process each row
-                    for _, row in df.iterrows():
-                        try:
-                            # Validate required field
-                            if 'display_name' not in row or pd.isna(row['display_name']) or row['display_name'] == '':
-                                error_count += 1
-                                continue
-                                
-                            # Create user object
-                            user = User(
-                                display_name=row['display_name'],
-                                first_name=row.get('first_name') if 'first_name' in row and not pd.isna(row['first_name']) else None,
-                                last_name=row.get('last_name') if 'last_name' in row and not pd.isna(row['last_name']) else None
-                            )
-                            
-                            # Add user to database
-                            user_id = queries.create_user(user)
-                            
-                            # Set ELO if provided
-                            elo_value = 1500.0  # Default
-                            if 'elo' in row and not pd.isna(row['elo']):
-                                try:
-                                    elo_value = float(row['elo'])
-                                except ValueError:
-                                    pass  # Use default if conversion fails
-                            
-                            queries.update_elo(user_id, elo_value, "Bulk import - initial setup")
-                            
-                            success_count += 1
-                        except Exception as e:
-                            error_count += 1
-                            st.error(f"Error importing row {_+1}: {str(e)}")
+                    for error in result.errors:
+                        st.error(f"Error importing {error}")
                     
                     # Show results
-                    if success_count > 0:
-                        st.success(f"Successfully imported {success_count} players!")
-                    if error_count > 0:
-                        st.warning(f"Failed to import {error_count} players. Check the format and try again.")
-                    
-                    if success_count > 0:
-                        st.rerun()
+                    if result.imported > 0:
+                        st.success(f"Successfully imported {result.imported} players!")
+                    if result.skipped > 0:
+                        st.warning(f"Failed to import {result.skipped} players. Check the format and try again.")
             except Exception as e:
                 st.error(f"Error processing CSV file: {str(e)}")
     
     # Player list
     st.header("Existing Players")
-    players = queries.get_all_users()
     
     # Add search functionality
     search_query = st.text_input("Search Players", placeholder="Enter name to search...")
-    if search_query:
-        # Filter players based on search query (case-insensitive)
-        search_query = search_query.lower()
-        players = [p for p in players if search_query in p['display_name'].lower() or 
-                  (p['first_name'] and search_query in p['first_name'].lower()) or 
-                  (p['last_name'] and search_query in p['last_name'].lower())]
+    with profiling.stage("fetch players"):
+        if search_query:
+            # Indexed prefix search over display, first and last names; one extra row tells if it was cut off
+            search_results = queries.search_users(search_query, limit=queries.SEARCH_LIMIT + 1)
+            search_truncated = len(search_results) > queries.SEARCH_LIMIT
+            search_results = sorted(search_results[:queries.SEARCH_LIMIT], key=lambda p: p['display_name'])
+            total_players = len(search_results)
+        else:
+            total_players = queries.count_users()
     
-    if not players:
+    if not total_players:
         st.info("No players have been added yet.")
     else:
-        # Get ELO ratings for all players
-        elo_data = {player['user_id']: player['elo'] for player in queries.get_all_elos()}
+        if search_query and search_truncated:
+            st.info(f"Showing the first {queries.SEARCH_LIMIT} matches, refine your search to see the rest.")
+        
+        # Both tabs show the same page: only one page of players is queried and rendered
+        page_count = max(-(-total_players // EDIT_PAGE_SIZE), 1)
+        # Seed the widget through its key (clamped to the page count) rather than value=
+        st.session_state.players_page = min(st.session_state.get('players_page', 1), page_count)
+        page = 1
+        if page_count > 1:
+            page = st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count,
+                                   step=1, key="players_page")
+        offset = (page - 1) * EDIT_PAGE_SIZE
+        
+        with profiling.stage("fetch page"):
+            if search_query:
+                page_players = search_results[offset:offset + EDIT_PAGE_SIZE]
+            else:
+                page_players = queries.get_users_page(EDIT_PAGE_SIZE, offset)
         
         # Create tabs for different views
         tab1, tab2 = st.tabs(["View Players", "Edit Players"])
@@ -176,8 +168,8 @@ Mike Johnson,Mike,Johnson,1450"""
                 
                 st.markdown("---")
                 
-                # Display each player with checkbox
-                for player in sorted(players, key=lambda p: p['display_name']):
+                # Display each player on this page with checkbox
+                for player in page_players:
                     cols = st.columns([0.5, 3, 2, 2, 1.5])
                     is_selected = cols[0].checkbox("", key=f"select_{player['id']}")
                     if is_selected:
@@ -185,20 +177,24 @@ Mike Johnson,Mike,Johnson,1450"""
                     cols[1].text(player['display_name'])
                     cols[2].text(player['first_name'] or "")
                     cols[3].text(player['last_name'] or "")
-                    cols[4].text(f"{elo_data.get(player['id'], 1500.0):.1f}")
+                    cols[4].text(f"{player['elo'] if player['elo'] is not None else 1500.0:.1f}")
                 
                 # Add bulk delete button
                 if selected_players:
                     if st.button(f"Delete Selected Players ({len(selected_players)})", type="primary"):
+                        st.session_state.confirm_bulk_delete = True
+                    
+                    if st.session_state.get('confirm_bulk_delete'):
                         st.warning("Are you sure you want to delete these players? This cannot be undone.")
                         if st.button("Yes, Delete Selected", type="primary"):
-                            for player_id in selected_players:
-                                try:
-                                    queries.delete_user(player_id)
-                                except Exception as e:
-                                    st.error(f"Error deleting player ID {player_id}: {str(e)}")
-                            st.success(f"Successfully deleted {len(selected_players)} players!")
-                            st.rerun()
+                            st.session_state.confirm_bulk_delete = False
+                            try:
+                                # One transaction for the whole selection
+                                counts = queries.delete_users(selected_players)
+                                st.success(f"Successfully deleted {counts.get('users', 0)} players!")
+                                st.rerun()
+                            except Exception as e:
+                                st.error(f"Error deleting players: {str(e)}")
             else:
                 cols = st.columns([3, 2, 2, 1.5])
                 cols[0].markdown("**Display Name**")
@@ -208,79 +204,73 @@ Mike Johnson,Mike,Johnson,1450"""
                 
                 st.markdown("---")
                 
-                # Display each player
-                for player in sorted(players, key=lambda p: p['display_name']):
+                # Display each player on this page
+                for player in page_players:
                     cols = st.columns([3, 2, 2, 1.5])
                     cols[0].text(player['display_name'])
                     cols[1].text(player['first_name'] or "")
                     cols[2].text(player['last_name'] or "")
-                    cols[3].text(f"{elo_data.get(player['id'], 1500.0):.1f}")
+                    cols[3].text(f"{player['elo'] if player['elo'] is not None else 1500.0:.1f}")
         
         with tab2:
-            # Create an edit/delete interface
-            for player in sorted(players, key=lambda p: p['display_name']):
-                with st.expander(f"{player['display_name']} (ELO: {elo_data.get(player['id'], 1500.0):.1f})"):
-                    with st.form(key=f"edit_player_{player['id']}"):
-                        # Edit fields
-                        display_name = st.text_input("Display Name", value=player['display_name'], key=f"display_{player['id']}")
-                        
-                        col1, col2 = st.columns(2)
-                        with col1:
-                            first_name = st.text_input("First Name", value=player['first_name'] or "", key=f"first_{player['id']}")
-                        with col2:
-                            last_name = st.text_input("Last Name", value=player['last_name'] or "", key=f"last_{player['id']}")
-                        
-                        # ELO rating field
-                        current_elo = elo_data.get(player['id'], 1500.0)
-                        elo = st.number_input("ELO Rating", value=float(current_elo), step=10.0, key=f"elo_{player['id']}")
-                        
-                        # Form buttons
-                        col1, col2 = st.columns(2)
-                        with col1:
-                            submit = st.form_submit_button("Update Player")
-                        with col2:
-                            delete = st.form_submit_button("Delete Player", type="secondary")
-                        
-                        if submit:
-                            if not display_name:
-                                st.error("Display Name is required")
-                            else:
-                                # Update user information
-                                updated_user = User(
-                                    id=player['id'],
-                                    display_name=display_name,
-                                    first_name=first_name if first_name else None,
-                                    last_name=last_name if last_name else None
-                                )
-                                
-                                try:
-                                    # Update user info
-                                    queries.update_user(updated_user)
-                                    
-                                    # Update ELO if changed
-                                    if elo != current_elo:
-                                        queries.update_elo(
-                                            player['id'], 
-                                            elo, 
-                                            f"Manual adjustment from {current_elo:.1f} to {elo:.1f}"
-                                        )
-                                    
-                                    st.success(f"Player '{display_name}' updated successfully!")
-                                    st.rerun()
-                                except Exception as e:
-                                    st.error(f"Error updating player: {str(e)}")
-                        
-                        if delete:
-                            # Create a confirmation dialog
-                            st.warning(f"Are you sure you want to delete '{player['display_name']}'? This cannot be undone.")
-                            confirm_col1, confirm_col2 = st.columns(2)
-                            with confirm_col1:
-                                if st.button("Yes, Delete", key=f"confirm_delete_{player['id']}", type="primary"):
-                                    try:
-                                        queries.delete_user(player['id'])
-                                        st.success(f"Player '{player['display_name']}' deleted successfully!")
-                                        st.rerun()
-                                    except Exception as e:
-                                        st.error(f"Error deleting player: {str(e)}")
-                            with confirm_col2:
-                                st.button("Cancel", key=f"cancel_delete_{player['id']}", type="secondary")
+            original = pd.DataFrame(
+                [{
+                    'id': p['id'],
+                    'display_name': p['display_name'] or "",
+                    'first_name': p['first_name'] or "",
+                    'last_name': p['last_name'] or "",
+                    'elo': float(p['elo']) if p['elo'] is not None else 1500.0
+                } for p in page_players],
+                columns=['id', 'display_name', 'first_name', 'last_name', 'elo']
+            )
+            
+            st.caption("Edit cells directly, then save. Use bulk delete under View Players to remove players.")
+            edited = st.data_editor(
+                original,
+                key=f"edit_players_grid_{page}_{search_query}",
+                hide_index=True,
+                use_container_width=True,
+                num_rows="fixed",
+                disabled=['id'],
+                column_config={
+                    "id": st.column_config.NumberColumn("ID"),
+                    "display_name": st.column_config.TextColumn("Display Name", required=True),
+                    "first_name": st.column_config.TextColumn("First Name"),
+                    "last_name": st.column_config.TextColumn("Last Name"),
+                    "elo": st.column_config.NumberColumn("ELO Rating", format="%.1f", step=10.0)
+                }
+            )
+            
+            if st.button("Save Changes", type="primary"):
+                # Collect the diff: only rows/fields that actually changed are written
+                edited = edited.fillna({'display_name': "", 'first_name': "", 'last_name': ""})
+                name_columns = ['display_name', 'first_name', 'last_name']
+                names_changed = (edited[name_columns] != original[name_columns]).any(axis=1)
+                elo_changed = edited['elo'].notna() & (edited['elo'] != original['elo'])
+                
+                if (edited.loc[names_changed, 'display_name'].str.strip() == "").any():
+                    st.error("Display Name is required")
+                else:
+                    updated_users = [
+                        User(
+                            id=int(row.id),
+                            display_name=row.display_name,
+                            first_name=row.first_name or None,
+                            last_name=row.last_name or None
+                        )
+                        for row in edited[names_changed].itertuples()
+                    ]
+                    elo_changes = [
+                        (int(row.id), float(row.elo), f"Manual adjustment from {old_elo:.1f} to {row.elo:.1f}")
+                        for row, old_elo in zip(edited[elo_changed].itertuples(), original.loc[elo_changed, 'elo'])
+                    ]
+                    
+                    if not updated_users and not elo_changes:
+                        st.info("No changes to save.")
+                    else:
+                        try:
+                            queries.apply_player_edits(updated_users, elo_changes)
+                            st.success(f"Updated {len(updated_users)} players and {len(elo_changes)} ELO ratings!")
+                            st.rerun()
+                        except Exception as e:
+                            st.error(f"Error updating players: {str(e)}")
@@ -4,21 +4,52 @@ Player statistics and rankings page.
 import streamlit as st
 import pandas as pd
 import altair as alt
-from typing import List, Dict, Any
-from datetime import datetime
+from typing import List, Dict, Any, Optional
+from datetime import datetime, timedelta, timezone
 
-from db import queries
+from db import async_queries, queries, frames
+from db.models import MATCH_STATUS_COMPLETED, EloHistoryRow
+from utils import profiling
+from utils.downsample import lttb_indices
+
+# Maximum number of points sent to a single ELO history chart
+MAX_CHART_POINTS = 500
+
+# Time range options for ELO history, in days (None for all time)
+HISTORY_RANGES = {
+    "All time": None,
+    "Last 30 days": 30,
+    "Last 90 days": 90,
+    "Last year": 365,
+}
+
+def _range_start(days: Optional[int]) -> Optional[str]:
+    """Convert a range in days to an inclusive start timestamp (UTC, like SQLite's CURRENT_TIMESTAMP)."""
+    if days is None:
+        return None
+    return (datetime.now(timezone.utc) - timedelta(days=days)).strftime('%Y-%m-%d %H:%M:%S')
+
+def _downsample_history(df_history: pd.DataFrame, max_points: int) -> pd.DataFrame:
+    """Sort a history frame by time and keep at most max_points shape-preserving rows."""
+    df_history = df_history.sort_values('timestamp')
+    indices = lttb_indices(
+        df_history['timestamp'].to_numpy(dtype='datetime64[ns]').astype('int64'),
+        df_history['new_elo'].to_numpy(dtype='float64'),
+        max_points
+    )
+    return df_history.iloc[indices]
 
 def render_stats():
     """Render the player statistics page."""
     st.title("Player Statistics")
     
     # Create tabs for different stats views
-    tab1, tab2 = st.tabs(["Player Rankings", "ELO History"])
+    tab1, tab2, tab3 = st.tabs(["Player Rankings", "ELO History", "Head-to-Head"])
     
     with tab1:
         # Get all players with their Elo ratings
-        elo_data = queries.get_all_elos()
+        with profiling.stage("fetch rankings"):
+            elo_data = queries.get_all_elos()
         
         if not elo_data:
             st.info("No Elo data available yet.")
@@ -74,68 +105,30 @@ def render_stats():
         # Match Statistics section (if we implement match history)
         st.header("Match Statistics")
         
-        # Get all matches
-        matches = queries.get_all_matches()
+        # Load all matches as a typed frame with result columns precomputed
+        with profiling.stage("fetch match frame"):
+            df_all_matches = frames.load_match_frame()
         
-        if not matches:
+        if df_all_matches.empty:
             st.info("No matches recorded yet.")
             return
         
         # Display basic match statistics
-        st.metric("Total Matches Played", len(matches))
+        st.metric("Total Matches Played", len(df_all_matches))
         
-        # Filter matches that have scores
-        completed_matches = [m for m in matches if m['set_1_side_1_score'] is not None and m['set_1_side_2_score'] is not None]
+        df_completed = df_all_matches[df_all_matches['status'] == MATCH_STATUS_COMPLETED]
         
-        if completed_matches:
-            st.metric("Completed Matches", len(completed_matches))
+        if not df_completed.empty:
+            st.metric("Completed Matches", len(df_completed))
             
-            # Create a dataframe of match results
-            match_data = []
-            for match in completed_matches:
-                # Determine winner based on sets won
-                team1_sets = 0
-                team2_sets = 0
-                
-                # Count sets won
-                if match['set_1_side_1_score'] > match['set_1_side_2_score']:
-                    team1_sets += 1
-                elif match['set_1_side_1_score'] < match['set_1_side_2_score']:
-                    team2_sets += 1
-                    
-                if match['set_2_side_1_score'] is not None and match['set_2_side_2_score'] is not None:
-                    if match['set_2_side_1_score'] > match['set_2_side_2_score']:
-                        team1_sets += 1
-                    elif match['set_2_side_1_score'] < match['set_2_side_2_score']:
-                        team2_sets += 1
-                        
-                if match['set_3_side_1_score'] is not None and match['set_3_side_2_score'] is not None:
-                    if match['set_3_side_1_score'] > match['set_3_side_2_score']:
-                        team1_sets += 1
-                    elif match['set_3_side_1_score'] < match['set_3_side_2_score']:
-                        team2_sets += 1
-                
-                # Format team names
-                team1_name = match['side_1_user_1_display_name']
-                if match['side_1_user_2_display_name']:
-                    team1_name += f" & {match['side_1_user_2_display_name']}"
-                    
-                team2_name = match['side_2_user_1_display_name']
-                if match['side_2_user_2_display_name']:
-                    team2_name += f" & {match['side_2_user_2_display_name']}"
-                
-                # Add match result
-                match_data.append({
-                    'Match ID': match['id'],
-                    'Team 1': team1_name,
-                    'Team 2': team2_name,
-                    'Team 1 Sets': team1_sets,
-                    'Team 2 Sets': team2_sets,
-                    'Winner': 'Team 1' if team1_sets > team2_sets else 'Team 2' if team2_sets > team1_sets else 'Draw'
-                })
-            
-            # Convert to dataframe
-            df_matches = pd.DataFrame(match_data)
+            df_matches = df_completed.rename(columns={
+                'id': 'Match ID',
+                'team_1': 'Team 1',
+                'team_2': 'Team 2',
+                'side_1_sets': 'Team 1 Sets',
+                'side_2_sets': 'Team 2 Sets',
+                'winner': 'Winner'
+            })
             
             # Display recent matches
             st.subheader("Recent Match Results")
@@ -147,16 +140,16 @@ def render_stats():
     with tab2:
         st.header("Player ELO History")
         
-        # Get all players for selection
-        all_players = queries.get_all_users()
-        elo_data = {player['id']: player.get('elo', 1500.0) for player in queries.get_all_elos()}
+        # Get all players for selection, streamed straight into the label map
+        with profiling.stage("fetch history players"):
+            elo_data = {player['id']: player.get('elo', 1500.0) for player in queries.get_all_elos()}
+            player_names = {p.id: f"{p.display_name} (ELO: {elo_data.get(p.id, 1500.0):.1f})" for p in queries.iter_users()}
         
-        if not all_players:
+        if not player_names:
             st.info("No players available yet.")
             return
         
         # Create a selection dropdown for players
-        player_names = {p['id']: f"{p['display_name']} (ELO: {elo_data.get(p['id'], 1500.0):.1f})" for p in all_players}
         player_options = list(player_names.items())
         
         selected_player_id = st.selectbox(
@@ -166,24 +159,30 @@ def render_stats():
             help="Select a player to view their ELO history"
         )
         
+        # Time range filter, applied in the query
+        range_label = st.selectbox("Time Range", options=list(HISTORY_RANGES), key="elo_history_range")
+        start = _range_start(HISTORY_RANGES[range_label])
+        
         if selected_player_id:
-            # Get the player's ELO history
-            elo_history = queries.get_player_elo_history(selected_player_id)
+            # Stream the player's ELO history straight into a dataframe
+            with profiling.stage("fetch ELO history"):
+                df_history = pd.DataFrame.from_records(
+                    queries.iter_elo_history([selected_player_id], start=start),
+                    columns=EloHistoryRow._fields
+                )
             
-            if not elo_history:
+            if df_history.empty:
                 st.info(f"No ELO history available for this player. History is tracked after each ELO change.")
             else:
-                # Create dataframe for display and visualization
-                df_history = pd.DataFrame(elo_history)
+                df_history['old_elo'] = pd.to_numeric(df_history['old_elo'], errors='coerce')
+                df_history['new_elo'] = pd.to_numeric(df_history['new_elo'], errors='coerce')
+                df_history['timestamp'] = pd.to_datetime(df_history['timestamp'])
                 
-                # Add a change column to show the difference
-                df_history['change'] = df_history.apply(
-                    lambda row: (row['new_elo'] - row['old_elo']) if row['old_elo'] is not None else 0, 
-                    axis=1
-                )
+                # Add a change column to show the difference (first rating counts as no change)
+                df_history['change'] = (df_history['new_elo'] - df_history['old_elo']).fillna(0)
                 
                 # Format timestamps
-                df_history['formatted_time'] = pd.to_datetime(df_history['timestamp']).dt.strftime('%Y-%m-%d %H:%M')
+                df_history['formatted_time'] = df_history['timestamp'].dt.strftime('%Y-%m-%d %H:%M')
                 
                 # Display history table
                 st.subheader("ELO Rating History")
@@ -192,10 +191,6 @@ def render_stats():
                 display_history = df_history[['formatted_time', 'old_elo', 'new_elo', 'change', 'change_reason']].copy()
                 display_history.columns = ['Date', 'Previous ELO', 'New ELO', 'Change', 'Reason']
                 
-                # Convert numeric columns to float for proper formatting
-                for col in ['Previous ELO', 'New ELO', 'Change']:
-                    display_history[col] = pd.to_numeric(display_history[col], errors='coerce')
-                
                 # Add colored background for change column
                 st.dataframe(
                     display_history,
@@ -213,11 +208,11 @@ def render_stats():
                 if len(df_history) > 1:
                     st.subheader("ELO Rating Trend")
                     
-                    # Create data for visualization with time on the x-axis
-                    chart_data = df_history[['timestamp', 'new_elo']].copy()
-                    chart_data.columns = ['Time', 'ELO']
-                    chart_data['Time'] = pd.to_datetime(chart_data['Time'])
-                    chart_data = chart_data.sort_values('Time')
+                    # Downsample so the chart payload stays bounded for long histories
+                    chart_data = _downsample_history(df_history, MAX_CHART_POINTS)
+                    chart_data = chart_data[['timestamp', 'new_elo']].rename(columns={'timestamp': 'Time', 'new_elo': 'ELO'})
+                    if len(chart_data) < len(df_history):
+                        st.caption(f"Showing {len(chart_data)} of {len(df_history)} rating changes")
                     
                     # Create the line chart
                     line_chart = alt.Chart(chart_data).mark_line(point=True).encode(
@@ -230,3 +225,110 @@ def render_stats():
                     )
                     
                     st.altair_chart(line_chart, use_container_width=True)
+        
+        # Compare several players on one chart, sharing the same point budget
+        st.subheader("Compare Players")
+        compare_ids = st.multiselect(
+            "Players to compare",
+            options=[p[0] for p in player_options],
+            format_func=lambda x: player_names[x],
+            key="elo_compare_players"
+        )
+        
+        if compare_ids:
+            with profiling.stage("fetch comparison history"):
+                df_compare = pd.DataFrame.from_records(
+                    queries.iter_elo_history(compare_ids, start=start),
+                    columns=EloHistoryRow._fields
+                )
+            if df_compare.empty:
+                st.info("No ELO history available for the selected players.")
+            else:
+                df_compare['new_elo'] = pd.to_numeric(df_compare['new_elo'], errors='coerce')
+                df_compare['timestamp'] = pd.to_datetime(df_compare['timestamp'])
+                
+                points_per_player = max(MAX_CHART_POINTS // len(compare_ids), 3)
+                chart_data = pd.concat(
+                    [_downsample_history(group, points_per_player) for _, group in df_compare.groupby('user_id')],
+                    ignore_index=True
+                )
+                chart_data = chart_data[['timestamp', 'new_elo', 'display_name']]
+                chart_data.columns = ['Time', 'ELO', 'Player']
+                
+                compare_chart = alt.Chart(chart_data).mark_line(point=True).encode(
+                    x=alt.X('Time:T', title='Date'),
+                    y=alt.Y('ELO:Q', title='ELO Rating', scale=alt.Scale(zero=False)),
+                    color=alt.Color('Player:N', title='Player'),
+                    tooltip=['Player:N', 'Time:T', 'ELO:Q']
+                ).properties(
+                    title='ELO Rating Comparison',
+                    height=350
+                )
+                
+                st.altair_chart(compare_chart, use_container_width=True)
+    
+    with tab3:
+        st.header("Head-to-Head & Partnerships")
+        
+        with profiling.stage("fetch pair players"):
+            pair_names = {p.id: p.display_name for p in queries.iter_users()}
+        if len(pair_names) < 2:
+            st.info("Need at least two players to compare.")
+            return
+        
+        player_ids = list(pair_names)
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            player_a = st.selectbox("Player", options=player_ids, format_func=lambda x: pair_names[x], key="pair_player_a")
+        with col2:
+            player_b = st.selectbox("Other Player", options=player_ids, index=1,
+                                    format_func=lambda x: pair_names[x], key="pair_player_b")
+        
+        if player_a == player_b:
+            st.info("Select two different players to compare.")
+            return
+        
+        # Independent lookups on the pair tables, fetched concurrently on the read pool
+        with profiling.stage("fetch pair stats"):
+            head_to_head, partnership, best_partners = async_queries.gather(
+                async_queries.get_head_to_head(player_a, player_b),
+                async_queries.get_partnership(player_a, player_b),
+                async_queries.get_best_partners(player_a, limit=10),
+            )
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            st.subheader(f"{pair_names[player_a]} vs {pair_names[player_b]}")
+            if head_to_head:
+                st.metric("Record (W-L)", f"{head_to_head['wins']}-{head_to_head['losses']}")
+                st.metric("Win Rate", f"{head_to_head['win_rate']:.0%}")
+                st.metric("Avg Point Differential", f"{head_to_head['avg_point_diff']:+.1f}")
+            else:
+                st.info("These players have not played against each other.")
+        with col2:
+            st.subheader(f"{pair_names[player_a]} with {pair_names[player_b]}")
+            if partnership:
+                st.metric("Record (W-L)", f"{partnership['wins']}-{partnership['losses']}")
+                st.metric("Win Rate", f"{partnership['win_rate']:.0%}")
+                st.metric("Avg Point Differential", f"{partnership['avg_point_diff']:+.1f}")
+            else:
+                st.info("These players have not partnered yet.")
+        
+        # Best partners for the first player
+        st.subheader(f"Best Partners for {pair_names[player_a]}")
+        if not best_partners:
+            st.info("No doubles partnerships recorded yet.")
+        else:
+            df_partners = pd.DataFrame(best_partners)[['display_name', 'matches', 'wins', 'losses', 'win_rate', 'avg_point_diff']]
+            df_partners.columns = ['Partner', 'Matches', 'Wins', 'Losses', 'Win Rate', 'Avg Point Diff']
+            df_partners['Win Rate'] = df_partners['Win Rate'] * 100
+            st.dataframe(
+                df_partners,
+                use_container_width=True,
+                hide_index=True,
+                column_config={
+                    "Win Rate": st.column_config.NumberColumn("Win Rate", format="%.0f%%"),
+                    "Avg Point Diff": st.column_config.NumberColumn("Avg Point Diff", format="%+.1f")
+                }
+            )
@@ -0,0 +1,138 @@
+"""
+Streaming CSV import of players and ELO ratings.
+
+Files are read in chunks, each chunk is validated and written in its own
+transaction, so memory stays flat and chunks committed before an error
+are kept.
+"""
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterator, List, Optional
+
+import pandas as pd
+
+from db import queries
+from db.models import User
+from utils.elo import BASE_RATING
+
+# Rows per chunk; also the size of each write transaction
+IMPORT_CHUNK_SIZE = 1000
+
+# Cap on collected error messages so a bad file can't grow memory
+MAX_IMPORT_ERRORS = 20
+
+@dataclass
+class ImportResult:
+    imported: int = 0
+    skipped: int = 0
+    errors: List[str] = field(default_factory=list)
+
+    def add_error(self, message: str) -> None:
+        if len(self.errors) < MAX_IMPORT_ERRORS:
+            self.errors.append(message)
+
+ProgressCallback = Callable[[float, ImportResult], None]
+
+def iter_csv_chunks(file: Any, chunk_size: int = IMPORT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """Yield a CSV file as DataFrames of at most chunk_size rows, all columns as text."""
+    with pd.read_csv(file, chunksize=chunk_size, dtype=str, skipinitialspace=True) as reader:
+        for chunk in reader:
+            yield chunk
+
+def _text_column(chunk: pd.DataFrame, column: str) -> pd.Series:
+    """A stripped text column with missing values as empty strings."""
+    if column not in chunk:
+        return pd.Series("", index=chunk.index)
+    return chunk[column].fillna("").str.strip()
+
+def _report(file: Any, progress: Optional[ProgressCallback], result: ImportResult) -> None:
+    """Report progress as the fraction of the file consumed so far."""
+    if progress is None:
+        return
+    size = getattr(file, 'size', None)
+    try:
+        fraction = min(file.tell() / size, 1.0) if size else 0.0
+    except (AttributeError, OSError):
+        fraction = 0.0
+    progress(fraction, result)
+
+def import_players(file: Any, with_elo: bool = True,
+                   change_reason: str = "Bulk import - initial setup",
+                   chunk_size: int = IMPORT_CHUNK_SIZE,
+                   progress: Optional[ProgressCallback] = None) -> ImportResult:
+    """
+    Import players from a CSV with display_name, first_name, last_name and
+    (optionally) elo columns.
+
+    Args:
+        file: Path or file-like object (e.g. a Streamlit upload)
+        with_elo: Set an initial ELO for every imported player (default 1500)
+        change_reason: ELO history reason for the initial ratings
+        chunk_size: Rows read and committed per transaction
+        progress: Called after each chunk with (fraction_done, result)
+
+    Returns:
+        ImportResult with imported/skipped counts and error messages
+    """
+    result = ImportResult()
+    first_row = 0
+    for chunk in iter_csv_chunks(file, chunk_size):
+        display_names = _text_column(chunk, 'display_name')
+        first_names = _text_column(chunk, 'first_name')
+        last_names = _text_column(chunk, 'last_name')
+        elos = pd.to_numeric(chunk['elo'], errors='coerce') if 'elo' in chunk else pd.Series(float('nan'), index=chunk.index)
+
+        # Rows without a display name are skipped
+        valid = display_names != ""
+        result.skipped += int((~valid).sum())
+
+        users = [
+            User(display_name=display_name, first_name=first_name or None, last_name=last_name or None)
+            for display_name, first_name, last_name in zip(display_names[valid], first_names[valid], last_names[valid])
+        ]
+        initial_elos = elos[valid].fillna(BASE_RATING).astype(float).tolist() if with_elo else None
+
+        try:
+            queries.create_users(users, initial_elos, change_reason)
+            result.imported += len(users)
+        except Exception as e:
+            result.skipped += len(users)
+            result.add_error(f"Rows {first_row + 1}-{first_row + len(chunk)}: {str(e)}")
+
+        first_row += len(chunk)
+        _report(file, progress, result)
+
+    return result
+
+def import_elos(file: Any, change_reason: Optional[str] = None,
+                chunk_size: int = IMPORT_CHUNK_SIZE,
+                progress: Optional[ProgressCallback] = None) -> ImportResult:
+    """
+    Import ELO ratings from a CSV with name (display name) and elo columns.
+
+    Names are resolved per chunk, so the full roster is never loaded at once.
+    Rows with an unknown name or an invalid rating are skipped.
+    """
+    result = ImportResult()
+    first_row = 0
+    for chunk in iter_csv_chunks(file, chunk_size):
+        names = _text_column(chunk, 'name')
+        elos = pd.to_numeric(chunk['elo'], errors='coerce') if 'elo' in chunk else pd.Series(float(BASE_RATING), index=chunk.index)
+
+        try:
+            user_ids = queries.get_user_ids_by_display_name(names[names != ""].unique().tolist())
+            changes = [
+                (user_ids[name], float(elo), change_reason)
+                for name, elo in zip(names, elos)
+                if name in user_ids and pd.notna(elo)
+            ]
+            queries.update_elos(changes)
+            result.imported += len(changes)
+            result.skipped += len(chunk) - len(changes)
+        except Exception as e:
+            result.skipped += len(chunk)
+            result.add_error(f"Rows {first_row + 1}-{first_row + len(chunk)}: {str(e)}")
+
+        first_row += len(chunk)
+        _report(file, progress, result)
+
+    return result
@@ -0,0 +1,49 @@
+"""
+Downsampling utilities for keeping chart payloads bounded.
+"""
+import numpy as np
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Pick the indices of at most `threshold` points that preserve the shape
+    of a series, using Largest-Triangle-Three-Buckets.
+
+    Args:
+        x: Monotonically increasing x values (e.g. timestamps as integers)
+        y: Values to plot
+        threshold: Maximum number of points to keep (at least 3 to downsample)
+
+    Returns:
+        Sorted array of indices into x/y, always including the first and last point
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # Interior points are split into threshold - 2 buckets; first and last are always kept
+    bucket_edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = bucket_edges[i], bucket_edges[i + 1]
+
+        # Average of the next bucket (or the last point) is the third triangle vertex
+        next_start, next_end = end, bucket_edges[i + 2] if i + 2 < len(bucket_edges) else n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        # Twice the triangle area for every candidate in this bucket
+        areas = np.abs(
+            (x[previous] - avg_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (avg_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        indices[i + 1] = previous
+
+    return indices
@@ -2,7 +2,9 @@
 Elo rating calculation utilities.
 """
 import math
-from typing import Tuple, List
+from typing import Tuple, List, Sequence
+
+from db.models import PlayerTable
 
 # Constants for Elo calculation
 K_FACTOR = 32  # Standard K-factor for Elo calculations
@@ -77,3 +79,32 @@ def calculate_win_probability(team1_ratings: Tuple[float, float],
     # Use the Elo formula to calculate win probability
     win_probability = 1 / (1 + math.pow(10, (team2_avg - team1_avg) / 400))
     return win_probability
+
+def apply_match_result(table: PlayerTable, team1_ids: Sequence[int], team2_ids: Sequence[int],
+                       team1_won: bool) -> List[Tuple[int, float]]:
+    """
+    Update the ratings of a match's players in place on a PlayerTable.
+    
+    Args:
+        table: Table containing every player in the match
+        team1_ids: Player ids of team 1
+        team2_ids: Player ids of team 2
+        team1_won: True if team 1 won, False if team 2 won
+    
+    Returns:
+        List of (user_id, new_rating) for every player in the match
+    """
+    ratings = table.ratings
+    team1_indices = [table.index(user_id) for user_id in team1_ids]
+    team2_indices = [table.index(user_id) for user_id in team2_ids]
+    
+    new_team1_ratings, new_team2_ratings = update_doubles_elo(
+        tuple(ratings[i] for i in team1_indices),
+        tuple(ratings[i] for i in team2_indices),
+        team1_won
+    )
+    
+    for i, rating in zip(team1_indices + team2_indices, new_team1_ratings + new_team2_ratings):
+        ratings[i] = rating
+    
+    return list(zip(list(team1_ids) + list(team2_ids), new_team1_ratings + new_team2_ratings))
@@ -0,0 +1,155 @@
+"""
+Streaming export of matches, ELO history and ratings to CSV and Parquet.
+
+Rows are pulled from the database in batches and written straight to a
+file, so memory stays flat no matter how large the tables grow.
+"""
+import csv
+import io
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+
+from db import database, queries
+
+# Rows per written CSV chunk / Parquet record batch
+EXPORT_BATCH_SIZE = queries.EXPORT_BATCH_SIZE
+
+EXPORT_DATASETS: Dict[str, Callable[[], Tuple[List[str], Iterator[tuple]]]] = {
+    'matches': queries.export_matches,
+    'elo_history': queries.export_elo_history,
+    'ratings': queries.export_ratings,
+}
+
+EXPORT_FORMATS = ('csv', 'parquet')
+
+MIME_TYPES = {
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+def export_dir() -> Path:
+    """Directory export files are written to, next to the database file."""
+    return Path(database.DB_PATH).parent / "exports"
+
+def _batches(rows: Iterable[tuple], batch_size: int) -> Iterator[List[tuple]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def iter_csv(columns: List[str], rows: Iterable[tuple], batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[str]:
+    """Yield CSV text in chunks: the header first, then one chunk per batch of rows."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.getvalue()
+
+    for batch in _batches(rows, batch_size):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(batch)
+        yield buffer.getvalue()
+
+def write_csv(columns: List[str], rows: Iterable[tuple], path: Path,
+              batch_size: int = EXPORT_BATCH_SIZE) -> int:
+    """Stream rows to a CSV file and return the number of rows written."""
+    count = 0
+
+    def counted() -> Iterator[tuple]:
+        nonlocal count
+        for row in rows:
+            count += 1
+            yield row
+
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        for chunk in iter_csv(columns, counted(), batch_size):
+            f.write(chunk)
+    return count
+
+def _arrow_type(column: str):
+    """Arrow type for an export column, inferred from its name."""
+    import pyarrow as pa
+
+    if column == 'elo' or column.endswith('_elo'):
+        return pa.float64()
+    if (column == 'id' or column.endswith('_id') or column.endswith('_score')
+            or column.endswith('_sets') or column == 'winner_side'):
+        return pa.int64()
+    return pa.string()
+
+def write_parquet(columns: List[str], rows: Iterable[tuple], path: Path,
+                  batch_size: int = EXPORT_BATCH_SIZE) -> int:
+    """
+    Stream rows to a Parquet file, one record batch per batch of rows.
+
+    Args:
+        columns: Column names, in row order
+        rows: Iterable of row tuples
+        path: Destination file
+        batch_size: Rows per record batch
+
+    Returns:
+        Number of rows written
+
+    Raises:
+        ImportError: If pyarrow is not installed
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Parquet export requires pyarrow (pip install pyarrow)") from e
+
+    # Fixed schema so batches with all-NULL columns still line up
+    schema = pa.schema([(column, _arrow_type(column)) for column in columns])
+    count = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        for batch in _batches(rows, batch_size):
+            arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*batch), schema)]
+            writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+            count += len(batch)
+    return count
+
+def _remove_old_exports(directory: Path, keep: Path) -> None:
+    """Delete earlier export files, so only the latest one is kept on disk."""
+    for fmt in EXPORT_FORMATS:
+        for old in directory.glob(f"*.{fmt}"):
+            if old != keep:
+                old.unlink(missing_ok=True)
+
+def export(dataset: str, fmt: str = 'csv') -> Tuple[Path, int]:
+    """
+    Export a dataset to a timestamped file in export_dir(), replacing the
+    previous export.
+
+    Args:
+        dataset: One of EXPORT_DATASETS
+        fmt: 'csv' or 'parquet'
+
+    Returns:
+        Tuple of (file path, number of rows written)
+    """
+    if dataset not in EXPORT_DATASETS:
+        raise ValueError(f"Unknown export dataset: {dataset}")
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+
+    directory = export_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{dataset}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{fmt}"
+
+    columns, rows = EXPORT_DATASETS[dataset]()
+    try:
+        write = write_csv if fmt == 'csv' else write_parquet
+        count = write(columns, rows, path)
+    except Exception:
+        rows.close()
+        path.unlink(missing_ok=True)
+        raise
+    _remove_old_exports(directory, path)
+    return path, count
@@ -2,79 +2,84 @@
 Player matching algorithms for creating balanced matches.
 """
 import random
-from typing import List, Dict, Any, Tuple, Optional
+from typing import List, Dict, Any, Tuple, Optional, Union
 import itertools
 
-def create_random_match(available_players: List[Dict[str, Any]]) -> Tuple[List[int], List[int]]:
+from db.models import PlayerTable
+
+Players = Union[PlayerTable, List[Dict[str, Any]]]
+
+def as_player_table(available_players: Players) -> PlayerTable:
+    """Return a PlayerTable for either a table or a list of player dicts with user_id and elo."""
+    if isinstance(available_players, PlayerTable):
+        return available_players
+    return PlayerTable.from_rows(
+        (player['user_id'], player.get('display_name'), player.get('elo'))
+        for player in available_players
+    )
+
+def create_random_match(available_players: Players) -> Tuple[List[int], List[int]]:
     """
     Create a random match from available players.
     
     Args:
-        available_players: List of player dictionaries with user_id and elo
+        available_players: PlayerTable, or list of player dictionaries with user_id and elo
     
     Returns:
         Tuple of (team1_player_ids, team2_player_ids)
     """
-    if len(available_players) < 4:
+    table = as_player_table(available_players)
+    if len(table) < 4:
         raise ValueError("Need at least 4 players to create a match")
     
     # Randomly select 4 players
-    selected_players = random.sample(available_players, 4)
+    selected = [table.ids[i] for i in random.sample(range(len(table)), 4)]
     
     # Divide into teams
-    team1 = [selected_players[0]['user_id'], selected_players[1]['user_id']]
-    team2 = [selected_players[2]['user_id'], selected_players[3]['user_id']]
+    team1 = [selected[0], selected[1]]
+    team2 = [selected[2], selected[3]]
     
     return (team1, team2)
 
-def create_balanced_match(available_players: List[Dict[str, Any]]) -> Tuple[List[int], List[int]]:
+def create_balanced_match(available_players: Players) -> Tuple[List[int], List[int]]:
     """
     Create a balanced match from available players based on Elo ratings.
     
     Args:
-        available_players: List of player dictionaries with user_id and elo
+        available_players: PlayerTable, or list of player dictionaries with user_id and elo
     
     Returns:
         Tuple of (team1_player_ids, team2_player_ids)
     """
-    if len(available_players) < 4:
+    table = as_player_table(available_players)
+    if len(table) < 4:
         raise ValueError("Need at least 4 players to create a match")
     
-    # Make sure all players have Elo ratings
-    for player in available_players:
-        if 'elo' not in player or player['elo'] is None:
-            player['elo'] = 1500  # Default Elo rating
-    
-    # Sort players by Elo (highest to lowest)
-    sorted_players = sorted(available_players, key=lambda p: p['elo'], reverse=True)
+    # Sort player positions by Elo (highest to lowest); unrated players are already at 1500
+    order = sorted(range(len(table)), key=table.ratings.__getitem__, reverse=True)
     
     # Method 1: Split by skill - best and worst vs 2nd and 3rd best
-    team1 = [sorted_players[0]['user_id'], sorted_players[3]['user_id']]
-    team2 = [sorted_players[1]['user_id'], sorted_players[2]['user_id']]
+    team1 = [table.ids[order[0]], table.ids[order[3]]]
+    team2 = [table.ids[order[1]], table.ids[order[2]]]
     
     return (team1, team2)
 
-def find_optimal_teams(available_players: List[Dict[str, Any]], team_size: int = 2) -> Tuple[List[int], List[int]]:
+def find_optimal_teams(available_players: Players, team_size: int = 2) -> Tuple[List[int], List[int]]:
     """
     Find the most balanced teams from available players based on Elo ratings.
     
     Args:
-        available_players: List of player dictionaries with user_id and elo
+        available_players: PlayerTable, or list of player dictionaries with user_id and elo
         team_size: Number of players in each team
     
     Returns:
         Tuple of (team1_player_ids, team2_player_ids)
     """
-    if len(available_players) < team_size * 2:
+    table = as_player_table(available_players)
+    if len(table) < team_size * 2:
         raise ValueError(f"Need at least {team_size * 2} players to create balanced teams")
     
-    # Ensure all players have an Elo rating
-    players_with_elo = []
-    for player in available_players:
-        elo = player.get('elo')
-        if elo is None:
-            elo = 1500  # Default Elo rating
-        players_with_elo.append({'user_id': player['user_id'], 'elo': elo})
+    ratings = table.ratings
     
     # Try all possible combinations of teams
     best_diff = float('inf')
@@ -82,35 +87,36 @@ def find_optimal_teams(available_players: List[Dict[str, Any]], team_size: int =
     best_team2 = []
     
     # Get all possible combinations of team_size players
-    all_players = list(range(len(players_with_elo)))
+    all_players = range(len(table))
     for team1_indices in itertools.combinations(all_players, team_size):
-        team2_indices = [i for i in all_players if i not in team1_indices]
+        team2_indices = [i for i in all_players if i not in team1_indices][:team_size]
         
         # Calculate total Elo for each team
-        team1_elo = sum(players_with_elo[i]['elo'] for i in team1_indices)
-        team2_elo = sum(players_with_elo[i]['elo'] for i in team2_indices[:team_size])
+        team1_elo = sum(ratings[i] for i in team1_indices)
+        team2_elo = sum(ratings[i] for i in team2_indices)
         
         # Calculate difference in team strength
         elo_diff = abs(team1_elo - team2_elo)
         
         if elo_diff < best_diff:
             best_diff = elo_diff
-            best_team1 = [players_with_elo[i]['user_id'] for i in team1_indices]
-            best_team2 = [players_with_elo[i]['user_id'] for i in team2_indices[:team_size]]
+            best_team1 = [table.ids[i] for i in team1_indices]
+            best_team2 = [table.ids[i] for i in team2_indices]
     
     return (best_team1, best_team2)
 
-def create_singles_match(available_players: List[Dict[str, Any]]) -> Tuple[List[int], List[int]]:
+def create_singles_match(available_players: Players) -> Tuple[List[int], List[int]]:
     """
     Create a singles match with close Elo ratings.
     
     Args:
-        available_players: List of player dictionaries with user_id and elo
+        available_players: PlayerTable, or list of player dictionaries with user_id and elo
     
     Returns:
         Tuple of ([player1_id], [player2_id])
     """
-    if len(available_players) < 2:
+    table = as_player_table(available_players)
+    if len(table) < 2:
         raise ValueError("Need at least 2 players to create a singles match")
     
-    return find_optimal_teams(available_players, team_size=1)
+    return find_optimal_teams(table, team_size=1)
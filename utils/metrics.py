@@ -0,0 +1,237 @@
+"""
+Prometheus-style metrics endpoint for the club server.
+
+When BADMINTON_METRICS_PORT is set, start_server() runs a small HTTP server
+in a daemon thread inside the Streamlit process and serves /metrics in the
+Prometheus text exposition format. It instruments db.queries to feed query
+latency, connection and write counters.
+
+Updates are lock-free: each thread writes to its own shard of plain dicts
+and a scrape sums the shards. Shards of finished threads (Streamlit runs
+scripts on short-lived threads) are folded into a retired shard whenever a
+new shard is registered or a scrape runs, so the registry does not grow.
+Until start_server() has run, inc() and observe() do nothing.
+
+Environment:
+    BADMINTON_METRICS_PORT   Port for the metrics server (disabled when unset)
+    BADMINTON_METRICS_HOST   Interface to bind (default 127.0.0.1)
+"""
+import bisect
+import os
+import threading
+import weakref
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+METRICS_PORT_ENV = "BADMINTON_METRICS_PORT"
+METRICS_HOST_ENV = "BADMINTON_METRICS_HOST"
+
+# Upper bounds (seconds) of the query latency histogram buckets
+QUERY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# name -> (type, help text)
+METRICS = {
+    'badminton_reruns_total': ('counter', "Script runs by page; fragment-only runs as 'fragment: <name>'."),
+    'badminton_query_duration_seconds': ('histogram', "Latency of db.queries calls by function."),
+    'badminton_query_errors_total': ('counter', "db.queries calls that raised, by function."),
+    'badminton_db_connections_total': ('counter', "SQLite connections opened."),
+    'badminton_cache_requests_total': ('counter', "Cached loader calls by cache."),
+    'badminton_cache_misses_total': ('counter', "Cached loader calls that had to recompute, by cache."),
+    'badminton_cache_hit_ratio': ('gauge', "Share of cached loader calls served from the cache."),
+    'badminton_matches_created_total': ('counter', "Matches created."),
+    'badminton_ratings_updated_total': ('counter', "Player ratings changed."),
+}
+
+# Query functions that create one match per successful call
+_MATCH_CREATE_FUNCTIONS = ('create_match', 'claim_and_create_match')
+
+# Query functions whose result is the number of ratings they changed
+_RATING_COUNT_FUNCTIONS = ('update_elos', 'apply_player_edits')
+
+Labels = Tuple[Tuple[str, str], ...]
+Key = Tuple[str, Labels]
+
+class _Shard:
+    """One thread's metric values."""
+    __slots__ = ('counters', 'histograms', '__weakref__')
+
+    def __init__(self):
+        self.counters: Dict[Key, float] = {}
+        # key -> per-bucket counts (non-cumulative, last is +Inf) followed by the sum
+        self.histograms: Dict[Key, List[float]] = {}
+
+_registry_lock = threading.Lock()
+_shards: List[Tuple[weakref.ref, _Shard]] = []
+_retired = _Shard()
+_local = threading.local()
+
+_server: Optional[ThreadingHTTPServer] = None
+_server_lock = threading.Lock()
+
+def _retire_finished() -> None:
+    """Fold the shards of finished threads into the retired shard (registry lock held)."""
+    alive = []
+    for thread_ref, shard in _shards:
+        thread = thread_ref()
+        if thread is None or not thread.is_alive():
+            _merge(_retired, shard.counters, shard.histograms)
+        else:
+            alive.append((thread_ref, shard))
+    _shards[:] = alive
+
+def _shard() -> _Shard:
+    shard = getattr(_local, 'shard', None)
+    if shard is None:
+        shard = _local.shard = _Shard()
+        with _registry_lock:
+            _retire_finished()
+            _shards.append((weakref.ref(threading.current_thread()), shard))
+    return shard
+
+def _key(name: str, labels: Dict[str, str]) -> Key:
+    return name, tuple(sorted((label, str(value)) for label, value in labels.items()))
+
+def inc(name: str, amount: float = 1, **labels: str) -> None:
+    """Add to a counter (no-op until the server is started)."""
+    if _server is None:
+        return
+    counters = _shard().counters
+    key = _key(name, labels)
+    counters[key] = counters.get(key, 0) + amount
+
+def observe(name: str, value: float, **labels: str) -> None:
+    """Record a value in a histogram using QUERY_BUCKETS (no-op until the server is started)."""
+    if _server is None:
+        return
+    histograms = _shard().histograms
+    key = _key(name, labels)
+    values = histograms.get(key)
+    if values is None:
+        values = histograms[key] = [0.0] * (len(QUERY_BUCKETS) + 2)
+    values[bisect.bisect_left(QUERY_BUCKETS, value)] += 1
+    values[-1] += value
+
+def _merge(target: _Shard, counters: Dict[Key, float], histograms: Dict[Key, List[float]]) -> None:
+    for key, value in counters.items():
+        target.counters[key] = target.counters.get(key, 0) + value
+    for key, values in histograms.items():
+        merged = target.histograms.setdefault(key, [0.0] * len(values))
+        for i, value in enumerate(values):
+            merged[i] += value
+
+def collect() -> _Shard:
+    """Sum of all shards; retires the shards of finished threads."""
+    total = _Shard()
+    with _registry_lock:
+        _retire_finished()
+        _merge(total, _retired.counters, _retired.histograms)
+        for _, shard in _shards:
+            # list() copies under the GIL while the owning thread keeps writing
+            _merge(total, dict(list(shard.counters.items())),
+                   {key: list(values) for key, values in list(shard.histograms.items())})
+    return total
+
+def _format_labels(labels: Labels, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ""
+    escaped = (value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return "{" + ",".join(f'{label}="{value}"' for (label, _), value in zip(pairs, escaped)) + "}"
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    total = collect()
+
+    # Derived gauge: hit ratio per cache
+    for (name, labels), requests in list(total.counters.items()):
+        if name == 'badminton_cache_requests_total' and requests:
+            misses = total.counters.get(('badminton_cache_misses_total', labels), 0)
+            total.counters[('badminton_cache_hit_ratio', labels)] = max(0.0, 1 - misses / requests)
+
+    lines = []
+    for name, (kind, help_text) in METRICS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        if kind == 'histogram':
+            for (metric, labels), values in sorted(total.histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0.0
+                for bound, count in zip(QUERY_BUCKETS + ('+Inf',), values):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(labels, (('le', str(bound)),))} {_format_value(cumulative)}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(values[-1])}")
+                lines.append(f"{name}_count{_format_labels(labels)} {_format_value(cumulative)}")
+        else:
+            for (metric, labels), value in sorted(total.counters.items()):
+                if metric == name:
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?', 1)[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        body = render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def _on_query(record) -> None:
+    observe('badminton_query_duration_seconds', record.seconds, function=record.function)
+    if record.error is not None:
+        inc('badminton_query_errors_total', function=record.function)
+        return
+    if record.function in _MATCH_CREATE_FUNCTIONS:
+        inc('badminton_matches_created_total')
+    elif record.function == 'update_elo':
+        inc('badminton_ratings_updated_total')
+    elif record.function in _RATING_COUNT_FUNCTIONS and isinstance(record.result, int):
+        inc('badminton_ratings_updated_total', record.result)
+
+def _on_connection(connect_seconds: float) -> None:
+    inc('badminton_db_connections_total')
+
+def is_enabled() -> bool:
+    return bool(os.environ.get(METRICS_PORT_ENV))
+
+def start_server(port: Optional[int] = None) -> Optional[ThreadingHTTPServer]:
+    """
+    Start the metrics server once per process.
+
+    Args:
+        port: Port to listen on (defaults to BADMINTON_METRICS_PORT)
+
+    Returns:
+        The running server, or None when metrics are disabled
+    """
+    global _server
+    if _server is not None:
+        return _server
+    if port is None:
+        if not is_enabled():
+            return None
+        port = int(os.environ[METRICS_PORT_ENV])
+
+    with _server_lock:
+        if _server is None:
+            from db import instrumentation, queries
+
+            instrumentation.add_listener(_on_query)
+            instrumentation.add_connection_listener(_on_connection)
+            instrumentation.instrument(queries)
+
+            server = ThreadingHTTPServer((os.environ.get(METRICS_HOST_ENV, "127.0.0.1"), port), _MetricsHandler)
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+            _server = server
+    return _server
@@ -0,0 +1,166 @@
+"""
+Opt-in per-rerun render profiler.
+
+Enabled with the ?profile=1 query parameter or BADMINTON_PROFILE=1. Each
+script run times named stages (nested stages show their own "self" time,
+i.e. time not spent in child stages, which for a page is mostly widget
+rendering), shows a breakdown panel and keeps a rolling history of recent
+reruns in session state. When disabled, stage() is a no-op. Stages are
+also recorded as tracing spans when tracing is enabled.
+
+Functions decorated with st.fragment can rerun on their own, without the
+top of app.py running; decorate them with fragment() as well so those runs
+are counted, profiled and traced like a full rerun.
+"""
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from utils import metrics, tracing
+
+PROFILE_ENV = "BADMINTON_PROFILE"
+PROFILE_QUERY_PARAM = "profile"
+
+# Reruns kept in the rolling history
+HISTORY_SIZE = 30
+HISTORY_KEY = "render_profile_history"
+
+@dataclass(slots=True)
+class Stage:
+    name: str
+    depth: int
+    seconds: float = 0.0
+    child_seconds: float = 0.0
+
+class RenderProfiler:
+    """Stage timings for one script run."""
+
+    def __init__(self):
+        self.stages: List[Stage] = []
+        self._open: List[Stage] = []
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        stage = Stage(name, len(self._open))
+        self.stages.append(stage)
+        self._open.append(stage)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            stage.seconds = time.perf_counter() - start
+            self._open.pop()
+            if self._open:
+                self._open[-1].child_seconds += stage.seconds
+
+    @property
+    def total_seconds(self) -> float:
+        return time.perf_counter() - self._start
+
+_local = threading.local()
+
+def is_enabled() -> bool:
+    if os.environ.get(PROFILE_ENV, "").lower() in ("1", "true", "yes"):
+        return True
+    try:
+        return st.query_params.get(PROFILE_QUERY_PARAM) == "1"
+    except Exception:
+        return False
+
+def start() -> Optional[RenderProfiler]:
+    """Begin profiling this script run if profiling is enabled."""
+    _local.profiler = RenderProfiler() if is_enabled() else None
+    return _local.profiler
+
+def current() -> Optional[RenderProfiler]:
+    return getattr(_local, 'profiler', None)
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a block as a named stage of the current run (no-op when not profiling or tracing)."""
+    with tracing.span(name):
+        profiler = current()
+        if profiler is None:
+            yield
+            return
+        with profiler.stage(name):
+            yield
+
+def finish(page: str) -> None:
+    """Record the run in the rolling history and render the breakdown panel."""
+    profiler = current()
+    _local.profiler = None
+    if profiler is None:
+        return
+
+    total_ms = profiler.total_seconds * 1000
+    history: List[Dict[str, Any]] = st.session_state.setdefault(HISTORY_KEY, [])
+    history.append({
+        'time': pd.Timestamp.now().strftime('%H:%M:%S'),
+        'page': page,
+        'total_ms': round(total_ms, 1),
+        **{stage.name: round(stage.seconds * 1000, 1) for stage in profiler.stages if stage.depth == 0},
+    })
+    del history[:-HISTORY_SIZE]
+
+    with st.expander(f"⏱ Render profile: {total_ms:.0f} ms", expanded=False):
+        st.dataframe(
+            pd.DataFrame([
+                {
+                    'Stage': "\u2003" * stage.depth + stage.name,
+                    'Total (ms)': round(stage.seconds * 1000, 1),
+                    'Self (ms)': round((stage.seconds - stage.child_seconds) * 1000, 1),
+                    '% of run': round(stage.seconds * 1000 / total_ms * 100, 1) if total_ms else 0.0,
+                }
+                for stage in profiler.stages
+            ]),
+            hide_index=True,
+            use_container_width=True
+        )
+        st.caption(f"Last {len(history)} reruns")
+        st.dataframe(pd.DataFrame(history[::-1]), hide_index=True, use_container_width=True)
+
+def _is_fragment_rerun() -> bool:
+    """Whether this script run only reruns fragments (app.py's own setup did not run)."""
+    ctx = get_script_run_ctx()
+    return bool(ctx is not None and ctx.fragment_ids_this_run)
+
+def fragment(name: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """
+    Decorator for st.fragment functions: a fragment-only rerun gets its own
+    profiler and root trace named "fragment: <name>", finished when the
+    function returns (the breakdown panel renders inside the fragment).
+    During a full rerun the function runs inside the rerun's profile and
+    trace as usual.
+    
+    Apply it below @st.fragment.
+    """
+    def decorator(function: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _is_fragment_rerun():
+                return function(*args, **kwargs)
+            metrics.inc('badminton_reruns_total', page=f"fragment: {name}")
+            tracing.start_trace(f"fragment: {name}", fragment=name)
+            start()
+            try:
+                result = function(*args, **kwargs)
+            except BaseException:
+                # Includes st.rerun()/st.stop(), which end the run early
+                _local.profiler = None
+                tracing.finish_trace(interrupted=True)
+                raise
+            finish(f"fragment: {name}")
+            tracing.finish_trace()
+            return result
+        return wrapper
+    return decorator
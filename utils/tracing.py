@@ -0,0 +1,264 @@
+"""
+Opt-in span tracing to a local JSON-lines file.
+
+Enabled with BADMINTON_TRACE_FILE. Each script run is one trace: a root
+"rerun" span with nested spans for stages of the page, every db.queries
+call and every call into utils.matching and utils.elo. Finished traces are
+queued and a background thread appends them in batches, one OTLP/JSON
+ExportTraceServiceRequest per line (the format of the OpenTelemetry
+Collector file exporter), so the file can be loaded into Jaeger or any
+OTLP-aware viewer. When disabled nothing is wrapped and span() is a no-op.
+
+The open span is kept in a context variable, so work run with a copy of
+the caller's context (contextvars.copy_context().run, as db.async_queries
+does for its pool threads) records its spans under the caller's span.
+
+Environment:
+    BADMINTON_TRACE_FILE   Append traces to this file
+"""
+import atexit
+import contextvars
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from types import ModuleType
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+TRACE_FILE_ENV = "BADMINTON_TRACE_FILE"
+SERVICE_NAME = "badminton-club-manager"
+SCOPE_NAME = "badminton"
+
+# Seconds between writes, and most spans held in memory before new ones are dropped
+FLUSH_INTERVAL = 1.0
+MAX_QUEUED_SPANS = 20000
+
+# Statements attached to a query span
+MAX_STATEMENTS = 5
+
+# OTLP span kinds and status codes
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_CLIENT = 3
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+@dataclass(slots=True)
+class Span:
+    trace_id: str
+    span_id: str
+    parent_span_id: Optional[str]
+    name: str
+    start_ns: int
+    end_ns: int = 0
+    kind: int = SPAN_KIND_INTERNAL
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': self.kind,
+            'startTimeUnixNano': str(self.start_ns),
+            'endTimeUnixNano': str(self.end_ns),
+            'attributes': _otlp_attributes(self.attributes),
+            'status': {'code': STATUS_ERROR, 'message': self.error} if self.error else {'code': STATUS_OK},
+        }
+        if self.parent_span_id:
+            span['parentSpanId'] = self.parent_span_id
+        return span
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{'key': key, 'value': _otlp_value(value)} for key, value in attributes.items() if value is not None]
+
+class _Trace:
+    """Spans of one script run; spans[0] is the root."""
+
+    def __init__(self, name: str, attributes: Dict[str, Any]):
+        self.trace_id = os.urandom(16).hex()
+        self.spans: List[Span] = []
+        self.open(name, attributes, None)
+
+    def open(self, name: str, attributes: Dict[str, Any], parent: Optional[Span],
+             kind: int = SPAN_KIND_INTERNAL, start_ns: Optional[int] = None) -> Span:
+        span = Span(self.trace_id, os.urandom(8).hex(), parent.span_id if parent else None,
+                    name, start_ns or time.time_ns(), kind=kind, attributes=attributes)
+        # list.append is atomic, so spans from pool threads can be added concurrently
+        self.spans.append(span)
+        return span
+
+class _BatchWriter:
+    """Queues finished spans and appends them to the trace file from a daemon thread."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.pending: List[Span] = []
+        self.dropped = 0
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        threading.Thread(target=self._run, name="trace-writer", daemon=True).start()
+        atexit.register(self.flush)
+
+    def submit(self, spans: List[Span]) -> None:
+        with self.lock:
+            room = MAX_QUEUED_SPANS - len(self.pending)
+            self.pending.extend(spans[:room])
+            self.dropped += max(0, len(spans) - room)
+
+    def _run(self) -> None:
+        while True:
+            self.wake.wait(FLUSH_INTERVAL)
+            self.flush()
+
+    def flush(self) -> None:
+        with self.lock:
+            spans, self.pending = self.pending, []
+        if not spans:
+            return
+        request = {
+            'resourceSpans': [{
+                'resource': {'attributes': _otlp_attributes({'service.name': SERVICE_NAME})},
+                'scopeSpans': [{'scope': {'name': SCOPE_NAME}, 'spans': [span.to_otlp() for span in spans]}],
+            }]
+        }
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(request, separators=(',', ':')) + "\n")
+
+# (trace, innermost open span) of the running code, or None outside a trace
+_active: contextvars.ContextVar[Optional[Tuple[_Trace, Span]]] = contextvars.ContextVar("badminton_trace", default=None)
+_writer: Optional[_BatchWriter] = None
+_setup_lock = threading.Lock()
+
+def is_enabled() -> bool:
+    return bool(os.environ.get(TRACE_FILE_ENV))
+
+def _current() -> Optional[_Trace]:
+    active = _active.get()
+    return active[0] if active else None
+
+def _setup() -> None:
+    """Create the writer and wrap the traced modules, once per process."""
+    global _writer
+    with _setup_lock:
+        if _writer is not None:
+            return
+        from db import instrumentation, queries
+        from utils import elo, matching
+
+        instrumentation.add_listener(_on_query)
+        instrumentation.instrument(queries)
+        instrument(matching)
+        instrument(elo)
+        _writer = _BatchWriter(os.environ[TRACE_FILE_ENV])
+
+def start_trace(name: str = "rerun", **attributes: Any) -> Optional[str]:
+    """
+    Begin the trace for this script run, if tracing is enabled.
+
+    A trace left open by an interrupted run (st.rerun, st.stop) in this
+    context is finished first.
+
+    Returns:
+        The new trace id, or None when tracing is disabled
+    """
+    if not is_enabled():
+        return None
+    _setup()
+    if _current() is not None:
+        finish_trace(interrupted=True)
+    trace = _Trace(name, attributes)
+    _active.set((trace, trace.spans[0]))
+    return trace.trace_id
+
+def finish_trace(interrupted: bool = False, **attributes: Any) -> None:
+    """End the current trace and queue its spans for writing."""
+    trace = _current()
+    _active.set(None)
+    if trace is None:
+        return
+    now = time.time_ns()
+    for span in trace.spans:
+        if not span.end_ns:
+            span.end_ns = now
+    root = trace.spans[0]
+    root.attributes.update(attributes)
+    if interrupted:
+        root.attributes['rerun.interrupted'] = True
+    _writer.submit(trace.spans)
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """Trace a block as a child of the innermost open span (no-op outside a trace)."""
+    active = _active.get()
+    if active is None:
+        yield None
+        return
+    trace, parent = active
+    current = trace.open(name, attributes, parent)
+    token = _active.set((trace, current))
+    try:
+        yield current
+    except Exception as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.end_ns = time.time_ns()
+        _active.reset(token)
+
+def set_attribute(key: str, value: Any) -> None:
+    """Set an attribute on the innermost open span, if tracing."""
+    active = _active.get()
+    if active is not None:
+        active[1].attributes[key] = value
+
+def _on_query(record) -> None:
+    # Instrumentation reports a call once it finishes, so back-date the span
+    active = _active.get()
+    if active is None:
+        return
+    trace, parent = active
+    start_ns = int(record.started_at * 1e9)
+    query_span = trace.open(f"db.queries.{record.function}", {
+        'db.system': 'sqlite',
+        'code.function': record.function,
+        'db.rows': record.rows,
+        'db.connect_ms': round(record.connect_seconds * 1000, 3),
+        'db.queue_wait_ms': round(record.queue_seconds * 1000, 3) if record.queue_seconds else None,
+        'db.statement': ";\n".join(list(dict.fromkeys(record.statements))[:MAX_STATEMENTS]) or None,
+    }, parent, kind=SPAN_KIND_CLIENT, start_ns=start_ns)
+    query_span.end_ns = start_ns + int(record.seconds * 1e9)
+    query_span.error = record.error
+
+def traced(function: Callable[..., Any], name: Optional[str] = None) -> Callable[..., Any]:
+    """Return a version of a function that runs inside its own span."""
+    name = name or f"{function.__module__}.{function.__qualname__}"
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        with span(name):
+            return function(*args, **kwargs)
+
+    wrapper.__traced__ = True
+    return wrapper
+
+def instrument(module: ModuleType) -> None:
+    """Wrap every public function defined in a module in a span (idempotent)."""
+    for attribute, member in list(vars(module).items()):
+        if (attribute.startswith('_') or not inspect.isfunction(member)
+                or member.__module__ != module.__name__ or getattr(member, '__traced__', False)):
+            continue
+        setattr(module, attribute, traced(member, f"{module.__name__}.{attribute}"))